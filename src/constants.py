@@ -7,10 +7,17 @@ DEADZONE_CAMERA_THRESHOLD_X = (
     SCREEN_WIDTH // 2 + SCREEN_WIDTH // 4,
 )
 FPS = 60
+# the simulation runs in fixed ticks of 1 / SIM_TICK_RATE whatever FPS rendering gets,
+# rendering interpolates between the last two ticks
+SIM_TICK_RATE = 60
+# ticks run at most per rendered frame, a machine that falls behind drops time instead of spiraling
+SIM_MAX_STEPS_PER_FRAME = 5
 
 BASE_PATH = Path.cwd().parent
 ASSETS_PATH = BASE_PATH / "assets"
 MAP_PATH = BASE_PATH / "tilemap" / "tmx"
+MAP_CACHE_PATH = BASE_PATH / "tilemap" / "cache"
+COMPILED_ASSETS_PATH = BASE_PATH / "build" / "assets"
 
 BASE_SPEED = 150
 GRAVITY = 1200
@@ -27,3 +34,50 @@ GRID_NEIGHBOURS_9 = (
 
 TILEMAP_SCALE = 5
 PLAYER_SCALE = TILEMAP_SCALE / 2.5
+TILEMAP_CHUNK_SIZE = 8
+TILEMAP_STREAMING = False
+
+SPATIAL_HASH_CELL_SIZE = 256
+# px around the screen still drawn, covers healthbars and frames larger than an entity's bounds
+RENDER_CULL_MARGIN = 64
+
+# simulation level of detail, (max distance from the player in px, update every n ticks)
+# per tier, entities beyond the last tier sleep until the player comes closer,
+# the first tier should cover the screen and the largest chase radius
+SIM_LOD_TIERS = ((1400, 1), (2800, 4))
+# cap on the dt a skipping entity catches up with, collisions are resolved against the tiles the
+# moved hitbox overlaps, so one step must stay shorter than a hitbox to not pass through a platform
+SIM_LOD_MAX_DT = 4 / FPS
+
+# decode threads used by AssetManager.load_all, 0 loads everything on the main thread
+ASSET_LOADER_WORKERS = 4
+# load animations on first use / level prefetch and keep them under a byte budget,
+# the pinned prefixes are loaded up front and never evicted
+ASSET_LAZY_LOADING = False
+ASSET_BUDGET_BYTES = 16 * 1024 * 1024
+ASSET_PINNED_PREFIXES = ("player/", "projectile/")
+
+# max page size of the texture atlases animation frames and tiles are packed into
+TEXTURE_ATLAS_SIZE = 2048
+
+# load animations baked by `python -m lib.asset_compiler build` when they are up to date
+ASSET_USE_COMPILED = True
+
+# move and collide every enemy with numpy array ops in one batch per tick (needs numpy)
+ENTITY_SOA_BACKEND = False
+
+# time every frame phase into ring buffers, also switched on by --profile or the overlay hotkey (F3)
+PROFILER_ENABLED = False
+# frames of history the percentiles and dumps cover
+PROFILER_FRAMES = 600
+PROFILER_DUMP_PATH = BASE_PATH / "profiles"
+
+# sample the main thread's stack in the background and dump the samples of frames over budget (--flight-recorder)
+FLIGHT_RECORDER_ENABLED = False
+# seconds of work a frame may take before it is dumped
+FLIGHT_RECORDER_BUDGET = 1.5 / FPS
+FLIGHT_RECORDER_INTERVAL = 0.002
+# seconds of samples kept in memory
+FLIGHT_RECORDER_WINDOW = 2.0
+FLIGHT_RECORDER_MAX_DUMPS = 50
+FLIGHT_RECORDER_PATH = PROFILER_DUMP_PATH / "spikes"
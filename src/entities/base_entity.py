@@ -1,8 +1,9 @@
 from abc import ABC, abstractmethod
+from time import perf_counter
 from typing import (
     TYPE_CHECKING,
     Dict,
-    Set,
+    List,
     Tuple,
     Type,
     TypeVar,
@@ -13,9 +14,13 @@ import pygame
 from pygame.surface import Surface
 
 from entities.states.base_fsm import State
+from lib.profiler import profiler
+from lib.render_cull import render_cull
+from lib.sim_lod import sim_lod
+from lib.spatial_hash import entity_index
 from managers.asset_manager import assets_manager
 from ttypes.index_type import TPosType
-from utils.animation import Animation
+from utils.animation import Playhead
 
 if TYPE_CHECKING:
     from game import Game
@@ -29,8 +34,10 @@ AUTO_ADD_AVOIDABLES = ("player",)
 
 class BaseEntity(ABC):
     game: "Game" = None  # type: ignore
-    __instances: Set["BaseEntity"] = set()
-    __registry: Dict[Type["BaseEntity"], Set["BaseEntity"]] = {}
+    # dicts as insertion ordered sets, so entities update in the same order on every run
+    __instances: Dict["BaseEntity", None] = {}
+    __registry: Dict[Type["BaseEntity"], Dict["BaseEntity", None]] = {}
+    __next_uid = 0
 
     etype: str
     pos: pygame.Vector2
@@ -40,7 +47,7 @@ class BaseEntity(ABC):
     stats: Dict[str, float]
     current_state: State
     offset: Tuple[int, int]
-    animation: "Animation"
+    animation: "Playhead"
 
     def __init__(
         self,
@@ -50,38 +57,64 @@ class BaseEntity(ABC):
         states: Dict[str, State],
         offset: Tuple[int, int] = (0, 0),
     ):
+        # stable id in spawn order, unlike id() the same on every run
+        self.uid = BaseEntity.__next_uid
+        BaseEntity.__next_uid += 1
+
         if etype not in AUTO_ADD_AVOIDABLES:
             BaseEntity.add_to_group(self)
 
         self.etype = etype
         self.pos = pygame.Vector2(pos)
+        # pos at the start of the current tick, rendering interpolates from it to pos
+        self.prev_pos = pygame.Vector2(pos)
         self.size = size
         self.flipped = False
         self.states = states
         self.offset = offset
 
+        # rect / hitbox / bounds return these, moved in place to the current pos on every call
+        ox, oy = offset
+        self.__rect = pygame.Rect(0, 0, 0, 0)
+        self.__hitbox = pygame.Rect(0, 0, size[0] - 2 * ox, size[1] - 2 * oy)
+        self.__bounds = pygame.Rect(0, 0, 0, 0)
+
         default_state = "idle" if "idle" in self.states else list(self.states.keys())[0]
         self.current_state = self.states[default_state]
-        self.set_animation(etype + "/" + default_state)
+        self.animation = Playhead(assets_manager.assets[etype + "/" + default_state])
 
         self.stats = {"health": 1.0, "mana": float("-inf")}
 
         self.alive = True
+        # dt this entity simulates with this tick, set by sim_lod.schedule, 0 skips the update
+        self.sim_dt = 0.0
+
+        if etype not in AUTO_ADD_AVOIDABLES:
+            entity_index.update(self, self.bounds())
 
     def rect(self):
-        return pygame.Rect(self.pos, self.animation.get_frame().size)
+        """shared and rewritten by later calls, callers must not mutate it and copy it to keep it around"""
+        rect = self.__rect
+        rect.update(self.pos, self.animation.frame_size())
+        return rect
 
     def hitbox(self) -> pygame.Rect:
-        x, y = self.pos
-        ox, oy = self.offset
-        new_w, new_h = self.size[0] - 2 * ox, self.size[1] - 2 * oy
-        new_y = oy + y
-        new_x = x + ox
-        return pygame.Rect(new_x, new_y, new_w, new_h)
+        """shared and rewritten by later calls, callers must not mutate it and copy it to keep it around"""
+        hitbox = self.__hitbox
+        pos = self.pos
+        hitbox.x = pos.x + self.offset[0]
+        hitbox.y = pos.y + self.offset[1]
+        return hitbox
+
+    def bounds(self) -> pygame.Rect:
+        """area covered by either rect or hitbox, used for broadphase"""
+        bounds = self.__bounds
+        bounds.update(self.rect())
+        bounds.union_ip(self.hitbox())
+        return bounds
 
     def set_animation(self, name: str):
-        animation = assets_manager.assets[name].copy()
-        self.animation = animation
+        self.animation.play(assets_manager.assets[name])
 
     @abstractmethod
     def grounded(self) -> bool: ...
@@ -115,15 +148,12 @@ class BaseEntity(ABC):
     def update(self, dt: float):
         self.manage_state()
         if self.animation:
-            self.animation.update()
+            self.animation.update(dt)
 
     def get_renderable(self, offset: TPosType):
-        frame = self.animation.get_frame()
+        frame = self.animation.get_frame(self.flipped)
         render_pos = self.pos - pygame.Vector2(offset)
 
-        if self.flipped:
-            frame = pygame.transform.flip(frame, True, False)
-
         render_pos.x += (self.size[0] - frame.get_width()) / 2
         render_pos.y += (self.size[1] - frame.get_height()) / 2
 
@@ -131,17 +161,25 @@ class BaseEntity(ABC):
 
     def remove(self):
         cls = type(self)
-        BaseEntity.__instances.remove(self)
-        BaseEntity.__registry[cls].remove(self)
+        del BaseEntity.__instances[self]
+        del BaseEntity.__registry[cls][self]
+        entity_index.remove(self)
+        sim_lod.remove(self)
 
     def render(self, surface: pygame.Surface, offset: TPosType):
         frame, render_pos = self.get_renderable(offset)
         surface.blit(frame, render_pos)
 
+    def render_offset(self, offset: TPosType, alpha: float) -> pygame.Vector2:
+        """camera offset that makes render draw at prev_pos lerped towards pos by alpha"""
+        pos, prev = self.pos, self.prev_pos
+        t = 1.0 - alpha
+        return pygame.Vector2(offset[0] + (pos.x - prev.x) * t, offset[1] + (pos.y - prev.y) * t)
+
     @classmethod
     def add(cls: Type[TEntity], instance: TEntity):
         """maybe shouldnt use this externally, just for convinience its here"""
-        cls.__instances.add(instance)
+        cls.__instances[instance] = None
 
     @classmethod
     def add_to_group(cls: Type[TEntity], entity: TEntity):
@@ -149,27 +187,84 @@ class BaseEntity(ABC):
         registry_key = type(entity)
 
         if registry_key not in BaseEntity.__registry:
-            BaseEntity.__registry[registry_key] = set()
-        BaseEntity.__registry[registry_key].add(entity)
-        BaseEntity.__instances.add(entity)
+            BaseEntity.__registry[registry_key] = {}
+        BaseEntity.__registry[registry_key][entity] = None
+        BaseEntity.__instances[entity] = None
+
+    @classmethod
+    def get_instances(cls) -> List["BaseEntity"]:
+        """every registered entity in spawn order"""
+        return list(BaseEntity.__instances)
 
     @classmethod
-    def get_by_group(cls: Type[TEntity]) -> Set[TEntity]:
-        return cast(Set[TEntity], BaseEntity.__registry.get(cls, set()))
+    def get_by_group(cls: Type[TEntity]) -> List[TEntity]:
+        return cast(List[TEntity], list(BaseEntity.__registry.get(cls, ())))
 
     @classmethod
-    def render_all(cls, screen: Surface, dt: float, offset: TPosType):
-        killable: Set["BaseEntity"] = set()
+    def get_by_family(cls: Type[TEntity]) -> List[TEntity]:
+        """instances of cls and of every subclass of it"""
+        family: List[TEntity] = []
+        for registry_key, entities in BaseEntity.__registry.items():
+            if issubclass(registry_key, cls):
+                family.extend(cast(Dict[TEntity, None], entities))
+        return family
+
+    @classmethod
+    def schedule_all(cls, focus: TPosType, dt: float):
+        """
+        starts a tick, remembers every entity's pos for interpolation and picks
+        its sim_dt by its distance to focus
+        """
+        for entity in cls.__instances:
+            entity.prev_pos.update(entity.pos)
+        sim_lod.schedule(cls.__instances, focus, dt)
+
+        tilemap = cls.game.tilemap if cls.game is not None else None
+        if tilemap is not None and tilemap.streaming:
+            # past the streaming edge the tiles under an entity read as empty, it would fall through them
+            for entity in cls.__instances:
+                if entity.sim_dt > 0 and not tilemap.is_area_loaded(entity.hitbox):
+                    entity.sim_dt = 0.0
+
+    @classmethod
+    def update_all(cls):
+        killable: List["BaseEntity"] = []
+        # per class cost only while profiling, it takes two clock reads per entity
+        timed = profiler.enabled
         for entity in cls.__instances:
             if entity.alive:
-                entity.update(dt)
-                entity.render(screen, offset)
+                if entity.sim_dt > 0:
+                    if timed:
+                        started = perf_counter()
+                        entity.update(entity.sim_dt)
+                        profiler.attribute("update", type(entity), perf_counter() - started)
+                    else:
+                        entity.update(entity.sim_dt)
+                    entity_index.update(entity, entity.bounds())
             else:
-                killable.add(entity)
+                killable.append(entity)
 
         if len(killable) > 0:
             for entity in killable:
                 entity.remove()
 
+    @classmethod
+    def render_all(cls, screen: Surface, offset: TPosType, alpha: float = 1.0):
+        """alpha is how far rendering is between the previous and the current tick"""
+        # entity_index also holds projectiles, those are drawn by FireProjectile.render_all
+        on_screen = render_cull.query(entity_index)
+        drawn = 0
+        timed = profiler.enabled
+        for entity in cls.__instances:
+            if entity in on_screen:
+                if timed:
+                    started = perf_counter()
+                    entity.render(screen, entity.render_offset(offset, alpha))
+                    profiler.attribute("render", type(entity), perf_counter() - started)
+                else:
+                    entity.render(screen, entity.render_offset(offset, alpha))
+                drawn += 1
+        render_cull.record("entities", drawn, len(cls.__instances) - drawn)
+
     def get_visual_correction(self):
         return (0.0, 0.0)
@@ -1,6 +1,5 @@
-from abc import ABC, abstractmethod
-from random import uniform
-from typing import TYPE_CHECKING, Callable, Dict, Optional, Tuple, cast
+from abc import ABC
+from typing import TYPE_CHECKING, Dict, Optional, Tuple
 
 from pygame import Vector2
 from pygame.surface import Surface
@@ -11,10 +10,20 @@ from entities.projectile.fire import FireProjectile
 from entities.states import bat_fsm as bat_fsm
 from entities.states import ground_enemy_fsm
 from entities.states.base_fsm import State
+from lib.rng import RNG_FX, rng
 from managers.asset_manager import assets_manager
 from ttypes.index_type import TPosType
 from ui.widgets.healthbar import HealthbarUI
-from utils.combat_utils import horizontal_range, melee_range
+from utils.combat_utils import (
+    RANGE_BOX,
+    RANGE_MELEE,
+    RANGE_RADIAL,
+    TargetQuery,
+    TRange,
+    in_range,
+    is_vulnerable,
+)
+from utils.surface_cache import surface_variants
 from utils.timer import Timer
 
 if TYPE_CHECKING:
@@ -34,12 +43,17 @@ class Enemy(PhysicsEntity, ABC):
         hit_timer_ms: int = 0,
         attack_timer_ms: int = 0,
         chase_radius: int = 400,
-        attack_check: Callable[[BaseEntity, BaseEntity], bool] = melee_range,
+        chase_range: Optional[TRange] = None,
+        attack_range: TRange = (RANGE_MELEE, 0, 0),
     ) -> None:
         super().__init__(etype, pos, size, states, offset)
 
         self.target: Optional[BaseEntity] = None
+        self.target_query = TargetQuery()
         self.chase_radius = chase_radius
+        # ground enemies chase along their floor, level with the target
+        self.chase_range: TRange = chase_range or (RANGE_BOX, chase_radius, size[1])
+        self.attack_range = attack_range
         self.stats.update({"health": 1.0, "damage": 0.1})
 
         hit_anim = assets_manager.assets[f"{etype}/hit"]
@@ -53,25 +67,31 @@ class Enemy(PhysicsEntity, ABC):
 
         self.healthbar = HealthbarUI(self, visibility_timer=self.hit_timer.interval, width=100, height=10)
 
-        self._attack_check = attack_check
-
     def set_target(self, target: BaseEntity):
         self.target = target
+        self.target_query.invalidate()
 
     def remove_target(self):
         self.target = None
+        self.target_query.invalidate()
+
+    def query_target(self) -> TargetQuery:
+        """this tick's TargetQuery, measured here if query_targets has not covered this enemy yet"""
+        query = self.target_query
+        if not query.is_current():
+            query.refresh(self)
+        return query
 
     def is_target_vulnarable(self):
         if not self.target:
             return False
-        hit_timer = cast(Optional[Timer], getattr(self.target, "hit_timer"))
-        return hit_timer is not None and not hit_timer.has_reached_interval()
+        return is_vulnerable(self.target)
 
-    @abstractmethod
-    def can_chase(self, entity: BaseEntity) -> bool: ...
+    def can_chase(self, entity: BaseEntity) -> bool:
+        return in_range(self, entity, self.chase_range)
 
     def can_attack(self, entity: BaseEntity) -> bool:
-        return self._attack_check(self, entity)
+        return in_range(self, entity, self.attack_range)
 
     def take_damage(self, amount: float) -> Optional[bool]:
         self.stats["health"] -= amount
@@ -83,13 +103,10 @@ class Enemy(PhysicsEntity, ABC):
         frame, pos = self.get_renderable(offset)
 
         if not self.hit_timer.has_reached_interval() and self.get_state() != "death":
-            frame_cp = frame.copy()
-
-            t = uniform(0.1, 0.9)
+            t = rng[RNG_FX].uniform(0.1, 0.9)
             alpha = int(t * 255)
 
-            frame_cp.set_alpha(int(alpha))
-            surface.blit(frame_cp, pos)
+            surface.blit(surface_variants.get(frame, alpha=alpha), pos)
         else:
             surface.blit(frame, pos)
 
@@ -122,6 +139,7 @@ class Bat(Enemy):
             attack_timer_ms=hit_timer_ms,
             hit_timer_ms=attack_timer_ms,
             chase_radius=chase_radius,
+            chase_range=(RANGE_RADIAL, chase_radius, 0),
         )
 
         if self.current_state.name != "fly":
@@ -131,14 +149,7 @@ class Bat(Enemy):
         self.default_pos = Vector2(pos)
 
         self.attack_radius = attack_radius or self.hitbox().w // 2
-
-    def can_chase(self, entity: BaseEntity):
-        distance = self.pos.distance_to(entity.pos)
-        return distance <= self.chase_radius
-
-    def can_attack(self, entity: BaseEntity):
-        distance = self.pos.distance_to(entity.pos)
-        return distance <= self.attack_radius
+        self.attack_range = (RANGE_RADIAL, self.attack_radius, 0)
 
     def update(self, dt: float):
         self.healthbar.update()
@@ -175,14 +186,6 @@ class Mushroom(Enemy):
         )
         self.obey_gravity = True
 
-    def can_chase(self, entity: BaseEntity):
-        distance_y = abs(entity.pos.y - self.pos.y)
-        distance_x = entity.pos.x - self.pos.x
-        return distance_y <= self.size[1] and abs(distance_x) <= self.chase_radius
-
-    def can_attack(self, entity: BaseEntity) -> bool:
-        return super().can_attack(entity)
-
     def update(self, dt: float):
         self.healthbar.update()
         return super().update(dt)
@@ -215,9 +218,7 @@ class FireWorm(Enemy):
             hit_timer_ms=hit_timer_ms,
             attack_timer_ms=attack_timer_ms,
             chase_radius=chase_radius,
-            attack_check=lambda self_, target: horizontal_range(
-                self_, target, max_x=chase_radius // 2, max_y=self.size[1]
-            ),
+            attack_range=(RANGE_BOX, chase_radius // 2, size[1]),
         )
         self.obey_gravity = True
 
@@ -226,13 +227,6 @@ class FireWorm(Enemy):
         distance_x = entity.pos.x - self.pos.x
         return (distance_x, distance_y)
 
-    def can_chase(self, entity: BaseEntity):
-        distance_x, distance_y = self.get_distance_to(entity)
-        return distance_y <= self.size[1] and abs(distance_x) <= self.chase_radius
-
-    def can_attack(self, entity: BaseEntity) -> bool:
-        return super().can_attack(entity)
-
     def shoot_fireball(self):
         hbox = self.hitbox()
         pos = hbox.midleft if self.flipped else hbox.midright
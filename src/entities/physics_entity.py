@@ -1,13 +1,16 @@
 from typing import (
     Dict,
+    List,
     Literal,
     Tuple,
 )
 
 import pygame
 
-from entities.base_entity import BaseEntity
+from constants import BASE_SPEED, GRAVITY
+from entities.base_entity import AUTO_ADD_AVOIDABLES, BaseEntity
 from entities.states.base_fsm import State
+from lib.entity_store import entity_store
 
 T4Directions = Literal["up", "down", "left", "right"]
 TContactSides = Dict[T4Directions, bool]
@@ -38,17 +41,24 @@ class PhysicsEntity(BaseEntity):
             "down": False,
         }
 
+        # reused every physics step, the colliders around the hitbox and a rect probing next to it
+        self.__nearby_tiles: List[pygame.Rect] = []
+        self.__probe = pygame.Rect(0, 0, 0, 0)
+
+        if entity_store is not None and etype not in AUTO_ADD_AVOIDABLES:
+            entity_store.add(self)
+
     def grounded(self):
         return self.contact_sides["down"]
 
     def collision_horizontal(self):
-        tiles = self.game.tilemap.get_physics_rects(self.hitbox())
         hitbox = self.hitbox()
+        tiles = self.game.tilemap.get_physics_rects(hitbox, self.__nearby_tiles)
 
-        for tile in tiles:
-            if tile.colliderect(hitbox):
-                self.__resolve_horizontal_collision(hitbox, tile)
-                break
+        # first overlapping tile, found in C without an iterator
+        index = hitbox.collidelist(tiles)
+        if index >= 0:
+            self.__resolve_horizontal_collision(hitbox, tiles[index])
 
     def __resolve_horizontal_collision(self, hitbox: pygame.Rect, tile_rect: pygame.Rect):
         if self.velocity.x < 0:
@@ -62,13 +72,13 @@ class PhysicsEntity(BaseEntity):
         self.velocity.y = side.y
 
     def collision_vertical(self):
-        tiles = self.game.tilemap.get_physics_rects(self.hitbox())
         hitbox = self.hitbox()
+        tiles = self.game.tilemap.get_physics_rects(hitbox, self.__nearby_tiles)
 
-        for tile in tiles:
-            if tile.colliderect(hitbox):
-                self.__resolve_vertical_collision(hitbox, tile)
-                break
+        # first overlapping tile, found in C without an iterator
+        index = hitbox.collidelist(tiles)
+        if index >= 0:
+            self.__resolve_vertical_collision(hitbox, tiles[index])
 
     def __resolve_vertical_collision(self, hitbox: pygame.Rect, tile_rect: pygame.Rect):
         if self.velocity.y < 0:
@@ -78,29 +88,57 @@ class PhysicsEntity(BaseEntity):
         self.velocity.y = 0
 
     def handle_movement(self, dt: float):
-        from constants import BASE_SPEED, GRAVITY
-
+        pos, velocity = self.pos, self.velocity
         if self.obey_gravity:
-            self.pos.x += self.velocity.x * (BASE_SPEED * dt)
+            pos.x += velocity.x * (BASE_SPEED * dt)
             self.collision_horizontal()
 
-            self.velocity.y += GRAVITY * dt
-            self.pos.y += self.velocity.y * dt
+            velocity.y += GRAVITY * dt
+            pos.y += velocity.y * dt
             self.collision_vertical()
         else:
-            self.pos.x += self.velocity.x * dt
-            self.pos.y += self.velocity.y * dt
+            pos.x += velocity.x * dt
+            pos.y += velocity.y * dt
 
     def identify_contact_sides(self):
-        tiles_rect_around = self.game.tilemap.get_physics_rects(self.hitbox())
-
         hitbox = self.hitbox()
-        self.contact_sides["left"] = hitbox.move(-1, 0).collidelist(tiles_rect_around) >= 0
-        self.contact_sides["right"] = hitbox.move(1, 0).collidelist(tiles_rect_around) >= 0
-        self.contact_sides["down"] = hitbox.move(0, 1).collidelist(tiles_rect_around) >= 0
-        self.contact_sides["up"] = hitbox.move(0, -1).collidelist(tiles_rect_around) >= 0
-
-    def update(self, dt: float):
+        tiles_rect_around = self.game.tilemap.get_physics_rects(hitbox, self.__nearby_tiles)
+
+        probe = self.__probe
+        sides = self.contact_sides
+        probe.update(hitbox)
+        probe.x -= 1
+        sides["left"] = probe.collidelist(tiles_rect_around) >= 0
+        probe.x += 2
+        sides["right"] = probe.collidelist(tiles_rect_around) >= 0
+        probe.x -= 1
+        probe.y += 1
+        sides["down"] = probe.collidelist(tiles_rect_around) >= 0
+        probe.y -= 2
+        sides["up"] = probe.collidelist(tiles_rect_around) >= 0
+
+    def move(self, dt: float):
         self.handle_movement(dt)
         self.identify_contact_sides()
+
+    @classmethod
+    def move_all(cls):
+        """
+        moves every registered entity due this tick that entity_store does not
+        batch, all of them before any FSM runs so target queries see where
+        the enemies ended up this tick, like the batched backend does
+        """
+        for entity in cls.get_by_family():
+            if entity.alive and entity.sim_dt > 0 and (entity_store is None or entity not in entity_store):
+                entity.move(entity.sim_dt)
+
+    def remove(self):
+        super().remove()
+        if entity_store is not None:
+            entity_store.remove(self)
+
+    def update(self, dt: float):
+        # registered entities were already moved by move_all or entity_store.step this tick
+        if self.etype in AUTO_ADD_AVOIDABLES:
+            self.move(dt)
         super().update(dt)
@@ -1,10 +1,10 @@
 from math import pi
-from random import randint, uniform
 from typing import TYPE_CHECKING, Dict, Tuple, override
 
 import pygame
 
 from constants import (
+    FPS,
     JUMP_DISTANCE,
     MAX_FALL_SPEED,
     WALL_FRICTION_COEFFICIENT,
@@ -21,6 +21,8 @@ from entities.states.player_fsm import (
     SkillCastState,
     SlideState,
 )
+from lib.replay import controls
+from lib.rng import RNG_PARTICLES, rng
 from lib.skill import Skill
 from logger import logger
 from particle.particles import TwinWave, coned_particles
@@ -121,10 +123,11 @@ class Player(PhysicsEntity):
         self.attack_sizes = offsets
 
     def attack_hitbox(self):
-        """this version is valid, just need scale"""
+        """this version is valid, just need scale, a new rect the caller owns"""
         hbox = self.hitbox()
         if self.current_state.name != "attack":
-            return hbox
+            # hitbox() is shared and rewritten on the next call
+            return hbox.copy()
         attack_w, attack_h = self.attack_sizes[self.current_state.name]
         offset_x = (hbox.centerx - attack_w) if self.flipped else hbox.centerx
         return pygame.Rect(offset_x, hbox.top, attack_w, attack_h)
@@ -133,7 +136,7 @@ class Player(PhysicsEntity):
         if self.is_dashing or self.get_state() == "hit" or self.get_state() == "skillcast":
             return
 
-        keys = pygame.key.get_pressed()
+        keys = controls.get_pressed()
 
         input_vector = pygame.Vector2(0, 0)
 
@@ -246,10 +249,11 @@ class Player(PhysicsEntity):
         pm = self.game.particle_manager
         pos = self.hitbox().center
 
+        stream = rng[RNG_PARTICLES]
         base_angles = (
-            tuple(uniform(*PARTICLE_DIR_LEFT) for _ in range(5))
+            tuple(stream.uniform(*PARTICLE_DIR_LEFT) for _ in range(5))
             if self.flipped
-            else tuple(uniform(*PARTICLE_DIR_RIGHT) for _ in range(5))
+            else tuple(stream.uniform(*PARTICLE_DIR_RIGHT) for _ in range(5))
         )
 
         coned_particles(
@@ -258,14 +262,15 @@ class Player(PhysicsEntity):
             group=pm,
             filled=True,
             color=(0, 255, 255),
-            radius=randint(6, 12),
+            radius=stream.randint(6, 12),
             speed_range=(3, 5),
             reduce_factor=0.1,
         )
 
-    def manage_stats(self):
+    def manage_stats(self, dt: float):
         if self.stats["mana"] < 1:
-            self.stats["mana"] += self.stats["mana_regain"]
+            # mana_regain is per frame at FPS
+            self.stats["mana"] += self.stats["mana_regain"] * dt * FPS
             if self.stats["mana"] > 1:
                 self.stats["mana"] = 1
 
@@ -277,7 +282,7 @@ class Player(PhysicsEntity):
             self.velocity.x = 0
         if self.can_slide():
             self.velocity.y = min(self.velocity.y, MAX_FALL_SPEED * WALL_FRICTION_COEFFICIENT)
-        self.manage_stats()
+        self.manage_stats(dt)
         super().update(dt)
 
     @override
@@ -293,5 +298,4 @@ class Player(PhysicsEntity):
         self.twinwave.render(surface, (offset[0] + vis_fix * 25, offset[1]))
         if not self.is_dashing:
             frame, pos = self.get_renderable(offset)
-            frame_copy = frame.copy()
-            surface.blit(frame_copy, pos)
+            surface.blit(frame, pos)
@@ -4,29 +4,39 @@ from pygame import Rect, Surface
 from pygame.math import Vector2
 
 from constants import BASE_SPEED
+from lib.render_cull import render_cull
+from lib.spatial_hash import entity_index
 from managers.asset_manager import assets_manager
 from ttypes.index_type import TPosType
+from utils.animation import Playhead
 
 
 class FireProjectile:
     __instances: List["FireProjectile"] = []
+    __next_uid = 0
 
     def __init__(self, start_pos: TPosType, velocity: TPosType, projectile_range: float, flipped=False) -> None:
+        # spawn order, keeps collision handling order the same between runs
+        self.uid = FireProjectile.__next_uid
+        FireProjectile.__next_uid += 1
         self.velocity = Vector2(velocity)
         self.projectile_range = projectile_range
-        self.animation = assets_manager.assets["projectile/fire"].copy()
+        self.animation = Playhead(assets_manager.assets["projectile/fire"])
         self.pos = Vector2(start_pos)
+        self.prev_pos = Vector2(start_pos)
         self.size = self.animation.get_frame().size
 
         self.ready_to_kill = False
 
         FireProjectile.__instances.append(self)
+        entity_index.update(self, self.rect())
 
     def rect(self):
         return Rect(*(self.pos[0], self.pos[1]), *self.size)
 
     def update(self, dt: float):
-        self.animation.update()
+        self.prev_pos.update(self.pos)
+        self.animation.update(dt)
 
         displacement = self.velocity * dt * BASE_SPEED
         self.pos += displacement
@@ -38,7 +48,7 @@ class FireProjectile:
     def mark_ready_to_kill(self):
         """WARNING: do not call this if ready_to_kill is True"""
         self.ready_to_kill = True
-        self.animation = assets_manager.assets["projectile/fire_explosion"].copy()
+        self.animation.play(assets_manager.assets["projectile/fire_explosion"])
         self.velocity = Vector2(0, 0)
 
     def render(self, surface: Surface, offset: Vector2):
@@ -55,10 +65,20 @@ class FireProjectile:
         return [x for x in cls.__instances if not x.ready_to_kill]
 
     @classmethod
-    def render_all(cls, surface: Surface, dt: float, offset: Vector2):
+    def update_all(cls, dt: float):
         alive = []
         for instance in cls.__instances:
             if not instance.update(dt):
                 alive.append(instance)
-                instance.render(surface, offset)
+                entity_index.update(instance, instance.rect())
+            else:
+                entity_index.remove(instance)
         cls.__instances = alive
+
+    @classmethod
+    def render_all(cls, surface: Surface, offset: Vector2, alpha: float = 1.0):
+        t = 1.0 - alpha
+        for instance in cls.__instances:
+            if render_cull.visible("projectiles", instance.rect()):
+                # drawn at prev_pos lerped towards pos by alpha
+                instance.render(surface, offset + (instance.pos - instance.prev_pos) * t)
@@ -33,8 +33,7 @@ class FlyState(State["Bat"]):
         if entity.target is None:
             return None
 
-        distance = (entity.pos).distance_to(entity.target.pos)
-        if distance <= entity.chase_radius:
+        if entity.query_target().can_chase:
             return "chase"
         return None
 
@@ -51,27 +50,23 @@ class ChaseState(State["Bat"]):
             entity.velocity *= 0
             return
 
-        distance = (entity.target.pos).distance_to(entity.pos)
-        vector_dir = (entity.target.pos - entity.pos).normalize()
-        if distance < 1:
-            entity.velocity = vector_dir * BASE_SPEED
-        else:
-            entity.velocity = vector_dir * BASE_SPEED
-        if distance > entity.size[0] // 2:
+        query = entity.query_target()
+        entity.velocity = query.direction * BASE_SPEED
+        if query.distance > entity.size[0] // 2:
             entity.flipped = entity.velocity.x < 0
 
     def can_transition(self, entity: "Bat"):
         if entity.target is None:
             return None
 
-        if entity.is_target_vulnarable():
+        query = entity.query_target()
+        if query.target_vulnerable:
             entity.velocity *= 0
             return None
 
-        distance = (entity.pos).distance_to(entity.target.pos)
-        if distance > entity.chase_radius:
+        if not query.can_chase:
             return "fly"
-        if distance <= entity.attack_radius and entity.attack_timer.has_reached_interval():
+        if query.can_attack and entity.attack_timer.has_reached_interval():
             return "attack"
 
         return None
@@ -100,12 +95,12 @@ class AttackState(State["Bat"]):
         if entity.animation.has_animation_end():
             return "fly"
 
-        distance = (entity.pos).distance_to(entity.target.pos)
+        query = entity.query_target()
 
-        if distance > entity.chase_radius:
+        if not query.can_chase:
             return "fly"
 
-        if distance > entity.attack_radius:
+        if not query.can_attack:
             return "chase"
 
         return None
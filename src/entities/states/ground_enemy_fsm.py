@@ -18,7 +18,8 @@ class IdleState(State["Enemy"]):
         if entity.target is None:
             return None
 
-        if entity.can_chase(entity.target) and not entity.is_target_vulnarable():
+        query = entity.query_target()
+        if query.can_chase and not query.target_vulnerable:
             return "run"
 
         return None
@@ -32,7 +33,7 @@ class RunState(State["Enemy"]):
         if entity.target is None:
             return None
 
-        distance_x = entity.target.pos.x - entity.pos.x
+        distance_x = entity.query_target().dx
         if distance_x != 0:
             direction = distance_x / abs(distance_x)
         else:
@@ -45,13 +46,14 @@ class RunState(State["Enemy"]):
         if entity.target is None:
             return None
 
-        if entity.is_target_vulnarable():
+        query = entity.query_target()
+        if query.target_vulnerable:
             return "idle"
 
-        if entity.can_attack(entity.target) and entity.attack_timer.has_reached_interval():
+        if query.can_attack and entity.attack_timer.has_reached_interval():
             return "attack"
 
-        if not entity.can_chase(entity.target):
+        if not query.can_chase:
             return "idle"
 
         return None
@@ -115,6 +117,6 @@ class WormAttackState(AttackState):
         super().__init__(0, 10)
 
     def update(self, entity: "FireWorm", **kwargs) -> None:  # type:ignore
-        if entity.animation.frame_index == self.active_frame:
+        if entity.animation.entered_frame(self.active_frame):
             entity.shoot_fireball()
         return super().update(entity, **kwargs)
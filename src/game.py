@@ -1,4 +1,8 @@
-from itertools import chain
+import argparse
+import os
+import time
+from pathlib import Path
+from typing import Optional, Tuple
 
 import pygame
 
@@ -6,33 +10,90 @@ from collision.collision_resolution import melee_enemy_collision, projectile_col
 from constants import (
     ASSETS_PATH,
     DEADZONE_CAMERA_THRESHOLD_X,
+    FLIGHT_RECORDER_ENABLED,
     FPS,
     PLAYER_SCALE,
     SCREEN_HEIGHT,
     SCREEN_WIDTH,
+    SIM_MAX_STEPS_PER_FRAME,
+    SIM_TICK_RATE,
+    TILEMAP_CHUNK_SIZE,
     TILEMAP_SCALE,
+    TILEMAP_STREAMING,
 )
 from entities.base_entity import BaseEntity
 from entities.enemy_entity import Bat, Enemy, FireWorm, Mushroom
+from entities.physics_entity import PhysicsEntity
 from entities.player import Player
 from entities.projectile.fire import FireProjectile
 from environment.parallaxbg import ParallaxBg
+from lib.entity_store import entity_store
+from lib.flight_recorder import flight_recorder
+from lib.profiler import profiler
+from lib.render_cull import render_cull
+from lib.replay import Replay, controls, state_hash
+from lib.rng import rng
+from lib.spatial_hash import entity_index
 from lib.tilemap import Tilemap
+from logger import logger
 from managers.asset_manager import assets_manager
 from particle.particle_manager import ParticleManager
 from pydebug import Debug
 from ui.widgets.overlay import CooldownOverlay
 from ui.widgets.playerhud import PlayerHUD
+from utils.combat_utils import query_targets
+from utils.timer import sim_clock
 
 
 class Game:
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        headless: bool = False,
+        seed: int = 0,
+        record: Optional[Path] = None,
+        replay: Optional[Path] = None,
+        sample_spikes: bool = FLIGHT_RECORDER_ENABLED,
+    ) -> None:
+        # headless runs on the dummy video driver, never presents a frame and
+        # ticks a virtual clock as fast as the cpu allows
+        self.headless = headless
+        if headless:
+            os.environ["SDL_VIDEODRIVER"] = "dummy"
+            os.environ["SDL_AUDIODRIVER"] = "dummy"
+            # an earlier import may have initialised the display on the real driver
+            pygame.display.quit()
+            sim_clock.set_virtual(True)
+
+        # recording and playback need a run to be reproducible: the seed, tick
+        # input and a game clock starting at 0 that only ticks move
+        self.record_path = record
+        self.recording: Optional[Replay] = None
+        self.playback: Optional[Replay] = None
+        self.replay_mismatches = 0
+        self.first_mismatch: Optional[int] = None
+        tick_rate = SIM_TICK_RATE
+        if replay is not None:
+            self.playback = Replay.load(replay)
+            seed, tick_rate = self.playback.seed, self.playback.tick_rate
+            controls.playback = self.playback.inputs
+        elif record is not None:
+            self.recording = Replay(seed, tick_rate)
+        if record is not None or replay is not None:
+            sim_clock.set_virtual(True, start_ms=0)
+        rng.reseed(seed)
+
         pygame.init()
         self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
         self.clock = pygame.time.Clock()
 
         self.scroll = pygame.Vector2(0, 0)
         self.running = True
+
+        # seconds of real time not simulated yet and how far rendering is into the next tick
+        self.sim_dt = 1.0 / tick_rate
+        self.accumulator = 0.0
+        self.alpha = 1.0
+        self.dt = 0.0
         interface_classes = (
             BaseEntity,
             Tilemap,
@@ -45,11 +106,11 @@ class Game:
         for interface in interface_classes:
             interface.game = self
 
-        assets_manager.load_all()
+        assets_manager.load_all(convert_frames=not headless)
 
         self.level = 1
 
-        player_base_size = assets_manager.assets["player/idle"].get_frame().size
+        player_base_size = assets_manager.assets["player/idle"].frame(0).size
         self.player = Player((2000, 200), player_base_size, (0, 0))
         self.player.set_attack_size(
             {
@@ -59,11 +120,20 @@ class Game:
             }
         )
 
-        self.tilemap = Tilemap(tile_scale=TILEMAP_SCALE)
+        self.tilemap = Tilemap(
+            tile_scale=TILEMAP_SCALE,
+            chunk_size=TILEMAP_CHUNK_SIZE,
+            use_map_cache=True,
+            streaming=TILEMAP_STREAMING,
+        )
         init_load = self.tilemap.load_map(self.level)
         if not init_load:
             raise Exception("tilemap not initialized")
-        self.load_entities()
+        assets_manager.prefetch_level(self.tilemap.entities)
+        if self.tilemap.streaming:
+            self.tilemap.update_streaming(self.player.pos, max_loads=None)
+        else:
+            self.load_entities()
 
         self.parallaxbg = ParallaxBg(ASSETS_PATH / "parallax")
 
@@ -71,56 +141,89 @@ class Game:
 
         self.player_hud = PlayerHUD(self.player)
 
+        # started last so loading the level is not sampled as one huge first frame
+        if sample_spikes:
+            flight_recorder.start(self.state_summary)
+
     def load_entities(self):
+        for key, positions in self.tilemap.entities.items():
+            for pos in positions:
+                self.spawn_entity(key, pos)
+
+    def spawn_entity(self, key: str, pos: Tuple[int, int]) -> Optional[Enemy]:
         enemies_hbox_offset: dict[str, tuple[int, int]] = {
             "bat": (0, 0),
             "mushroom": (0, -20),
             "fireworm": (0, -10),
         }
 
-        for key, positions in self.tilemap.entities.items():
-            if key == "bat":
-                size = assets_manager.assets["bat/fly"].get_frame().size
-                hox, hoy = enemies_hbox_offset[key]
-
-                for x, y in positions:
-                    bat = Bat((x, y), size, offset=(hox, hoy))
-                    bat.set_target(self.player)
-
-            elif key == "mushroom":
-                size = assets_manager.assets["bat/fly"].get_frame().size
-                hox, hoy = enemies_hbox_offset[key]
-
-                for x, y in positions:
-                    mushroom = Mushroom((x, y), size, offset=(hox, hoy))
-                    mushroom.set_target(self.player)
-
-            elif key == "fireworm":
-                size = assets_manager.assets["fireworm/idle"].get_frame().size
-                hox, hoy = enemies_hbox_offset[key]
-
-                for x, y in positions:
-                    fireworm = FireWorm((x, y), size, offset=(hox, hoy))
-                    fireworm.set_target(self.player)
+        if key == "bat":
+            size = assets_manager.assets["bat/fly"].frame(0).size
+            enemy = Bat(pos, size, offset=enemies_hbox_offset[key])
+        elif key == "mushroom":
+            size = assets_manager.assets["bat/fly"].frame(0).size
+            enemy = Mushroom(pos, size, offset=enemies_hbox_offset[key])
+        elif key == "fireworm":
+            size = assets_manager.assets["fireworm/idle"].frame(0).size
+            enemy = FireWorm(pos, size, offset=enemies_hbox_offset[key])
+        else:
+            return None
+
+        enemy.set_target(self.player)
+        return enemy
 
     def handle_event(self):
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 self.running = False
+            elif event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_F3:
+                    profiler.set_enabled(True)
+                    profiler.show_overlay = not profiler.show_overlay
+                elif event.key == pygame.K_F4:
+                    profiler.dump()
+
+    def state_summary(self) -> dict:
+        """what was going on in a frame, saved with the flight recorder's samples of a slow one"""
+        entities: dict[str, int] = {}
+        for entity in BaseEntity.get_instances():
+            name = type(entity).__name__
+            entities[name] = entities.get(name, 0) + 1
+        return {
+            "tick": controls.tick,
+            "game_time_ms": sim_clock.now(),
+            "player_pos": [round(self.player.pos[0], 1), round(self.player.pos[1], 1)],
+            "entities": entities,
+            "projectiles": len(FireProjectile.get_instances()),
+            "particles": len(self.particle_manager.particles),
+            "loaded_chunks": len(self.tilemap.chunks),
+            "fps": round(self.clock.get_fps(), 1),
+        }
+
+    def camera_focus(self) -> pygame.Rect:
+        """player rect where it is drawn this frame, between the last two ticks"""
+        player = self.player
+        shift = player.pos.lerp(player.prev_pos, 1.0 - self.alpha) - player.pos
+        return player.rect().move(shift)
 
-    def player_center_camera(self):
+    @staticmethod
+    def camera_smoothing(factor: float, dt: float) -> float:
+        """factor is the share of the distance covered per frame at FPS, scaled to dt"""
+        return 1.0 - (1.0 - factor) ** (dt * FPS)
+
+    def player_center_camera(self, dt: float):
         sw, sh = self.screen.size
-        player_rect = self.player.rect()
+        player_rect = self.camera_focus()
         target_scroll_x = player_rect.centerx - sw // 2
         target_scroll_y = player_rect.centery - sh // 2
         scroll_x, scroll_y = self.scroll
 
-        self.scroll.x = scroll_x + (target_scroll_x - scroll_x) * 0.1
-        self.scroll.y = scroll_y + (target_scroll_y - scroll_y) * 0.05
+        self.scroll.x = scroll_x + (target_scroll_x - scroll_x) * self.camera_smoothing(0.1, dt)
+        self.scroll.y = scroll_y + (target_scroll_y - scroll_y) * self.camera_smoothing(0.05, dt)
 
-    def deadzone_camera(self):
+    def deadzone_camera(self, dt: float):
         sh = self.screen.size[1]
-        player_rect = self.player.rect()
+        player_rect = self.camera_focus()
         scroll_x, scroll_y = self.scroll
         target_scroll_x = scroll_x
         target_scroll_y = player_rect.centery - sh // 2
@@ -130,47 +233,150 @@ class Game:
         elif player_rect.centerx > scroll_x + DEADZONE_CAMERA_THRESHOLD_X[1]:
             target_scroll_x = player_rect.centerx - DEADZONE_CAMERA_THRESHOLD_X[1]
 
-        self.scroll.x += (target_scroll_x - scroll_x) * 0.1
-        self.scroll.y += (target_scroll_y - scroll_y) * 0.05
+        self.scroll.x += (target_scroll_x - scroll_x) * self.camera_smoothing(0.1, dt)
+        self.scroll.y += (target_scroll_y - scroll_y) * self.camera_smoothing(0.05, dt)
 
     def handle_collision(self):
         player = self.player
-        collision_enemies = chain(Bat.get_by_group(), Mushroom.get_by_group(), FireWorm.get_by_group())
-        for enemy in collision_enemies:
-            melee_enemy_collision(player, enemy)
-
-        collision_projectiles = chain(FireProjectile.get_instances())
-
-        for projectile in collision_projectiles:
-            projectile_collision(projectile, player)
+        # player.rect() is the melee reach and player.hitbox() the area projectiles hit
+        player_area = player.rect().union(player.hitbox())
+        # the index hands them out in hash order, sort to resolve hits the same way on every run
+        nearby_objects = entity_index.query_rect(player_area)
+        nearby_objects.sort(key=lambda obj: (type(obj) is FireProjectile, obj.uid))
+        for nearby in nearby_objects:
+            if isinstance(nearby, Enemy):
+                melee_enemy_collision(player, nearby)
+            elif isinstance(nearby, FireProjectile) and not nearby.ready_to_kill:
+                projectile_collision(nearby, player)
+
+        for projectile in FireProjectile.get_instances():
             if self.tilemap.is_solid_tile((projectile.pos)):
                 projectile.mark_ready_to_kill()
 
     def update(self):
-        dt = self.clock.tick(FPS) / 1000.0
+        """runs as many fixed ticks as the real time since the last frame covers, exactly one when headless"""
+        profiler.begin_frame()
+        dt = self.sim_dt if self.headless else self.clock.tick(FPS) / 1000.0
         self.dt = dt
+        profiler.lap("wait")
+        flight_recorder.begin_frame()
         self.handle_event()
-        self.deadzone_camera()
+        profiler.lap("events")
+        assets_manager.assets.poll()
+        profiler.lap("asset_reloads")
+
+        sim_dt = self.sim_dt
+        self.accumulator = min(self.accumulator + dt, SIM_MAX_STEPS_PER_FRAME * sim_dt)
+        while self.accumulator >= sim_dt:
+            self.tick(sim_dt)
+            self.accumulator -= sim_dt
+        self.alpha = self.accumulator / sim_dt
+
+        # the camera only affects rendering, it follows the interpolated player every frame
+        self.deadzone_camera(dt)
+        profiler.lap("camera")
+
+    def tick(self, dt: float):
+        """one fixed step of the simulation"""
+        mask = controls.next_tick()
+        if mask is None:
+            # playback ran out of input
+            self.running = False
+            return
+        sim_clock.advance(dt)
+        self.player.prev_pos.update(self.player.pos)
+        profiler.lap("input")
         self.handle_collision()
+        profiler.lap("collision")
         self.player.update(dt)
+        profiler.lap("player")
+        self.tilemap.update_streaming(self.player.pos)
+        profiler.lap("tile_streaming")
+        BaseEntity.schedule_all(self.player.pos, dt)
+        if entity_store is not None:
+            entity_store.step(self.tilemap)
+        PhysicsEntity.move_all()
+        profiler.lap("entity_physics")
+        query_targets(Enemy.get_by_family())
+        profiler.lap("targeting")
+        BaseEntity.update_all()
+        profiler.lap("entity_update")
+        FireProjectile.update_all(dt)
+        profiler.lap("projectiles")
+        self.particle_manager.update(dt)
+        profiler.lap("particles")
+
+        if self.recording is not None:
+            self.recording.record(mask, state_hash(self))
+        elif self.playback is not None:
+            self.check_replay_tick(controls.tick - 1)
+        profiler.lap("replay")
+
+    def check_replay_tick(self, tick: int):
+        """compares the state after tick with the recorded one, logs the first divergence"""
+        if state_hash(self) == self.playback.hashes[tick]:
+            return
+        self.replay_mismatches += 1
+        if self.first_mismatch is None:
+            self.first_mismatch = tick
+            logger.warning(f"replay diverged at tick {tick}")
+
+    def close(self):
+        """saves a recording and the profile, reports how a playback went"""
+        flight_recorder.stop()
+        assets_manager.assets.close()
+        if profiler.enabled:
+            profiler.end_frame()
+            profiler.dump()
+        if self.recording is not None and self.record_path is not None:
+            self.recording.save(self.record_path)
+            logger.info(f"recorded {len(self.recording)} ticks to {self.record_path}")
+        if self.playback is not None:
+            played = min(controls.tick, len(self.playback))
+            if self.replay_mismatches:
+                logger.warning(f"replay: {self.replay_mismatches} of {played} ticks differ, first at {self.first_mismatch}")
+            else:
+                logger.info(f"replay: all {played} tick states match the recording")
 
     def render_all(self):
         self.screen.fill((50, 50, 100))
+        render_cull.begin(self.scroll, self.screen.size)
         self.parallaxbg.render()
+        profiler.lap("render_background")
 
-        BaseEntity.render_all(self.screen, self.dt, self.scroll)
-        self.player.render(self.screen, self.scroll)
+        alpha = self.alpha
+        BaseEntity.render_all(self.screen, self.scroll, alpha)
+        self.player.render(self.screen, self.player.render_offset(self.scroll, alpha))
+        profiler.lap("render_entities")
         self.tilemap.render()
-        FireProjectile.render_all(self.screen, self.dt, self.scroll)
+        profiler.lap("render_tiles")
+        FireProjectile.render_all(self.screen, self.scroll, alpha)
+        profiler.lap("render_projectiles")
 
+        profiler.draw_overlay()
         Debug.draw_all(self.screen)
+        profiler.lap("render_debug")
 
-        self.particle_manager.render(self.screen, self.dt)
+        self.particle_manager.render(self.screen, alpha)
+        profiler.lap("render_particles")
 
         self.player_hud.update()
         self.player_hud.render(self.screen)
+        profiler.lap("render_hud")
+
+        if not self.headless:
+            pygame.display.flip()
+        profiler.lap("flip")
+        flight_recorder.end_frame()
 
-        pygame.display.flip()
+    def run_headless(self, seconds: float, render: bool = False):
+        """fast forwards seconds of game time, drawing each tick into the offscreen surface only if render"""
+        for _ in range(round(seconds / self.sim_dt)):
+            if not self.running:
+                break
+            self.update()
+            if render:
+                self.render_all()
 
 
 if __name__ == "__main__":
@@ -178,9 +384,46 @@ if __name__ == "__main__":
     # screen = pygame.display.set_mode()
     # tilemap = Tilemap()
     # tilemap.load_map(0)
-    game = Game()
-    while game.running:
-        game.handle_event()
-        game.update()
-        game.render_all()
+    parser = argparse.ArgumentParser(description="run from src")
+    parser.add_argument("--headless", action="store_true", help="no window, simulate as fast as possible")
+    parser.add_argument("--seconds", type=float, default=60.0, help="game time simulated by --headless")
+    parser.add_argument("--render", action="store_true", help="still draw every tick offscreen with --headless")
+    parser.add_argument("--seed", type=int, default=0, help="seed of every rng stream")
+    parser.add_argument("--record", type=Path, help="write tick inputs and state hashes to this file")
+    parser.add_argument("--replay", type=Path, help="play a recording back and check its state hashes")
+    parser.add_argument("--profile", action="store_true", help="time frame phases, dumped on exit or with F4")
+    parser.add_argument("--flight-recorder", action="store_true", help="dump stack samples of frames over budget")
+    parser.add_argument("--frame-budget", type=float, help="ms a frame may take before the flight recorder dumps it")
+    args = parser.parse_args()
+    if args.profile:
+        profiler.set_enabled(True)
+    if args.frame_budget is not None:
+        flight_recorder.budget = args.frame_budget / 1000
+
+    game = Game(
+        headless=args.headless,
+        seed=args.seed,
+        record=args.record,
+        replay=args.replay,
+        sample_spikes=args.flight_recorder or FLIGHT_RECORDER_ENABLED,
+    )
+    if args.headless and args.replay is not None:
+        # the whole recording, as fast as possible
+        started = time.perf_counter()
+        while game.running:
+            game.update()
+            if args.render:
+                game.render_all()
+        logger.info(f"replayed {controls.tick} ticks in {time.perf_counter() - started:.2f}s")
+    elif args.headless:
+        started = time.perf_counter()
+        game.run_headless(args.seconds, render=args.render)
+        elapsed = time.perf_counter() - started
+        logger.info(f"simulated {args.seconds:.0f}s of game time in {elapsed:.2f}s ({args.seconds / elapsed:.1f}x)")
+    else:
+        while game.running:
+            game.handle_event()
+            game.update()
+            game.render_all()
+    game.close()
     pygame.quit()
@@ -0,0 +1,196 @@
+import argparse
+import hashlib
+import json
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import pygame
+
+from constants import ASSETS_PATH, BASE_PATH, COMPILED_ASSETS_PATH
+from lib.frame_pack import FRAME_PACK_NAME, FramePack, write_frame_pack
+from logger import logger
+from ttypes.index_type import AnimationSpec
+from utils.image_utils import decode_frames, get_numeric_sort_key
+
+# bump whenever the baked output of the same spec would change
+ASSET_COMPILER_VERSION = 1
+MANIFEST_NAME = "manifest.json"
+
+# animation name -> {"stamp", "hash", "frames"}, frames relative to the build dir
+TAssetManifest = Dict[str, Dict[str, Any]]
+
+
+def spec_sources(spec: AnimationSpec) -> List[Path]:
+    path = ASSETS_PATH / spec["source"]
+    if "frame_size" in spec:
+        return [path]
+    return sorted((p for p in path.iterdir() if p.suffix == ".png"), key=get_numeric_sort_key)
+
+
+def _spec_digest(spec: AnimationSpec):
+    options = sorted(spec.get("options", {}).items())
+    return hashlib.sha1(f"{ASSET_COMPILER_VERSION}:{spec.get('frame_size')}:{options}".encode())
+
+
+def source_stamp(spec: AnimationSpec) -> str:
+    """cheap fingerprint from mtimes and sizes, enough to trust an existing build"""
+    digest = _spec_digest(spec)
+    for source in spec_sources(spec):
+        stat = source.stat()
+        digest.update(f"{source.name}:{stat.st_mtime_ns}:{stat.st_size}".encode())
+    return digest.hexdigest()
+
+
+def source_hash(spec: AnimationSpec) -> str:
+    """content hash of the sources and options, decides whether a spec is rebuilt"""
+    digest = _spec_digest(spec)
+    for source in spec_sources(spec):
+        digest.update(source.name.encode())
+        digest.update(source.read_bytes())
+    return digest.hexdigest()
+
+
+def load_manifest(build_dir: Path = COMPILED_ASSETS_PATH) -> TAssetManifest:
+    manifest_path = build_dir / MANIFEST_NAME
+    if not manifest_path.exists():
+        return {}
+    try:
+        manifest = json.loads(manifest_path.read_text())
+    except (OSError, ValueError) as e:
+        logger.warning(f"unreadable asset manifest {manifest_path}: {e}")
+        return {}
+    if manifest.get("version") != ASSET_COMPILER_VERSION:
+        return {}
+    return manifest["animations"]
+
+
+def compiled_entry(manifest: TAssetManifest, name: str, spec: AnimationSpec) -> Optional[Dict[str, Any]]:
+    """manifest entry of name, None when it was never built or its sources changed since"""
+    entry = manifest.get(name)
+    if entry is None or entry["stamp"] != source_stamp(spec):
+        return None
+    return entry
+
+
+def _bake(job: Tuple[AnimationSpec, str, str]) -> List[str]:
+    """runs in a worker process, writes the frames of one spec under build_dir/<hash>"""
+    spec, digest, build_dir = job
+    out_dir = Path(build_dir) / digest
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    frames: List[str] = []
+    decoded = decode_frames(ASSETS_PATH / spec["source"], spec.get("frame_size"), **spec.get("options", {}))
+    for index, frame in enumerate(decoded):
+        pygame.image.save(frame, out_dir / f"{index}.png")
+        frames.append(f"{digest}/{index}.png")
+    return frames
+
+
+def build(
+    specs: Dict[str, AnimationSpec], build_dir: Path = COMPILED_ASSETS_PATH, jobs: Optional[int] = None, force: bool = False
+) -> TAssetManifest:
+    """
+    bakes trim / flip / scale of every spec into plain pngs plus a raw frame
+    pack of all of them, specs whose sources hash the same as in the previous
+    manifest are left alone and specs sharing sources and options share one
+    set of frames
+    """
+    build_dir.mkdir(parents=True, exist_ok=True)
+    previous = {} if force else load_manifest(build_dir)
+    manifest: TAssetManifest = {}
+    pending: Dict[str, AnimationSpec] = {}
+    reused = 0
+
+    for name, spec in specs.items():
+        stamp = source_stamp(spec)
+        entry = previous.get(name)
+        # a frame set deleted from the build dir is baked again even while its sources are unchanged
+        if entry is not None and not all((build_dir / frame).exists() for frame in entry["frames"]):
+            entry = None
+        if entry is not None and entry["stamp"] == stamp:
+            manifest[name] = entry
+            reused += 1
+            continue
+
+        digest = source_hash(spec)
+        if entry is not None and entry["hash"] == digest:
+            manifest[name] = {**entry, "stamp": stamp}
+            reused += 1
+            continue
+
+        manifest[name] = {"stamp": stamp, "hash": digest, "frames": []}
+        pending.setdefault(digest, spec)
+
+    if pending:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            jobs_args = [(spec, digest, str(build_dir)) for digest, spec in pending.items()]
+            baked = dict(zip(pending, pool.map(_bake, jobs_args)))
+        for entry in manifest.values():
+            if entry["hash"] in baked:
+                entry["frames"] = baked[entry["hash"]]
+
+    # drop frame sets nothing points at anymore
+    live = {entry["hash"] for entry in manifest.values()}
+    for out_dir in build_dir.iterdir():
+        if out_dir.is_dir() and out_dir.name not in live:
+            shutil.rmtree(out_dir)
+
+    pack_path = build_dir / FRAME_PACK_NAME
+    frame_sets = {entry["hash"]: entry["frames"] for entry in manifest.values()}
+    pack = FramePack.open(pack_path)
+    packed = set(pack.index) if pack is not None else None
+    if pack is not None:
+        pack.close()
+    if pending or packed != frame_sets.keys():
+        write_frame_pack(
+            pack_path,
+            ((digest, [pygame.image.load(build_dir / frame) for frame in frames]) for digest, frames in frame_sets.items()),
+        )
+
+    manifest_path = build_dir / MANIFEST_NAME
+    tmp_path = manifest_path.with_suffix(".tmp")
+    tmp_path.write_text(json.dumps({"version": ASSET_COMPILER_VERSION, "animations": manifest}, indent=1))
+    tmp_path.replace(manifest_path)
+
+    logger.info(f"baked {len(pending)} frame sets, {reused} of {len(specs)} animations up to date")
+    return manifest
+
+
+def trim(source: Path, out_dir: Path):
+    """crops the transparent border of every png below source into out_dir/<parent name>"""
+    from PIL import Image
+
+    out_dir.mkdir(exist_ok=True)
+    for file in source.rglob("*/**.png"):
+        image = Image.open(file)
+        image = image.crop(image.getbbox())
+        dest = out_dir.resolve() / file.parent.name / file.name
+        dest.parent.mkdir(exist_ok=True, parents=True)
+        image.save(dest)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(prog="python -m lib.asset_compiler", description="offline asset tooling, run from src")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    build_parser = commands.add_parser("build", help="bake every animation spec into COMPILED_ASSETS_PATH")
+    build_parser.add_argument("--jobs", type=int, default=None, help="worker processes, defaults to the cpu count")
+    build_parser.add_argument("--force", action="store_true", help="ignore the previous manifest")
+
+    trim_parser = commands.add_parser("trim", help="crop transparent borders of loose pngs (needs Pillow)")
+    trim_parser.add_argument("source", type=Path)
+    trim_parser.add_argument("--out", type=Path, default=BASE_PATH / "test_dir")
+
+    args = parser.parse_args(argv)
+    if args.command == "build":
+        from managers.asset_manager import ANIMATION_SPECS
+
+        build(ANIMATION_SPECS, jobs=args.jobs, force=args.force)
+    elif args.command == "trim":
+        trim(args.source, args.out)
+
+
+if __name__ == "__main__":
+    main()
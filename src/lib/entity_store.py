@@ -0,0 +1,268 @@
+from itertools import chain
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+from constants import BASE_SPEED, ENTITY_SOA_BACKEND, GRAVITY
+from logger import logger
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+if TYPE_CHECKING:
+    from entities.physics_entity import PhysicsEntity
+    from lib.tilemap import Tilemap
+
+# columns of EntityStore.contacts, same order as PhysicsEntity.contact_sides
+CONTACT_SIDES = ("left", "right", "up", "down")
+
+
+class EntityStore:
+    """
+    batched physics kernel for every registered PhysicsEntity, the entities
+    keep owning pos / velocity, step() gathers those of the entities due this
+    tick into scratch arrays, integrates each by its sim_dt, resolves tile
+    collisions for all of them with array ops against a summed-area table of
+    the collision grid and scatters the results back, only the hitbox
+    geometry, which never changes, lives in per slot rows
+    """
+
+    def __init__(self, capacity: int = 256) -> None:
+        self.entities: List["PhysicsEntity"] = []
+        self.__slots: Dict["PhysicsEntity", int] = {}
+        self.hitbox_offset = np.zeros((capacity, 2))
+        self.hitbox_size = np.zeros((capacity, 2))
+        self.__allocate_scratch(capacity)
+
+        self.__sat = None
+        self.__tile_size = (1, 1)
+        self.__origin = (0, 0)
+        self.__chunks_version = -1
+
+    def __len__(self):
+        return len(self.entities)
+
+    @property
+    def grid_span(self) -> Tuple[int, int, int, int]:
+        """first tile row and column and the rows / columns the collision table spans"""
+        rows, cols = (0, 0) if self.__sat is None else (self.__sat.shape[0] - 1, self.__sat.shape[1] - 1)
+        return (*self.__origin, rows, cols)
+
+    def __contains__(self, entity: "PhysicsEntity"):
+        return entity in self.__slots
+
+    def __allocate_scratch(self, capacity: int):
+        """step() buffers, the first due-count rows hold this tick's batch"""
+        self.__pos = np.zeros((capacity, 2))
+        self.__velocity = np.zeros((capacity, 2))
+        self.__contacts = np.zeros((capacity, len(CONTACT_SIDES)), dtype=bool)
+
+    def __grow(self):
+        count = len(self.entities)
+        capacity = max(2 * count, 1)
+        for name in ("hitbox_offset", "hitbox_size"):
+            old = getattr(self, name)
+            new = np.zeros((capacity, 2))
+            new[:count] = old[:count]
+            setattr(self, name, new)
+        self.__allocate_scratch(capacity)
+
+    def add(self, entity: "PhysicsEntity"):
+        if entity in self.__slots:
+            return
+        slot = len(self.entities)
+        if slot == len(self.hitbox_offset):
+            self.__grow()
+
+        self.entities.append(entity)
+        self.__slots[entity] = slot
+        ox, oy = entity.offset
+        self.hitbox_offset[slot] = (ox, oy)
+        self.hitbox_size[slot] = (entity.size[0] - 2 * ox, entity.size[1] - 2 * oy)
+
+    def remove(self, entity: "PhysicsEntity"):
+        """swaps the last entity into the freed slot"""
+        slot = self.__slots.pop(entity, None)
+        if slot is None:
+            return
+        last = len(self.entities) - 1
+        moved = self.entities.pop()
+        if slot != last:
+            self.entities[slot] = moved
+            self.__slots[moved] = slot
+            self.hitbox_offset[slot] = self.hitbox_offset[last]
+            self.hitbox_size[slot] = self.hitbox_size[last]
+
+    def clear(self):
+        self.entities.clear()
+        self.__slots.clear()
+
+    def __sync_grid(self, tilemap: "Tilemap"):
+        """
+        rebuilds the summed-area table whenever the tilemap loads or streams
+        chunks, it only spans the bounding box of the loaded chunks, everything
+        outside counts as empty like it does for the scalar resolver, entities
+        next to a chunk not streamed in yet are frozen by BaseEntity.schedule_all
+        """
+        if tilemap.chunks_version == self.__chunks_version:
+            return
+        self.__chunks_version = tilemap.chunks_version
+        self.__tile_size = (tilemap.tilewidth, tilemap.tileheight)
+
+        size = tilemap.chunk_size
+        coords = [divmod(key, tilemap.chunks_width) for key in tilemap.chunks]
+        if not coords:
+            self.__origin = (0, 0)
+            self.__sat = np.zeros((1, 1), dtype=np.int32)
+            return
+        top = min(cy for cy, _ in coords)
+        left = min(cx for _, cx in coords)
+        height = max(cy for cy, _ in coords) - top + 1
+        width = max(cx for _, cx in coords) - left + 1
+        # first tile row / column the table covers
+        self.__origin = (top * size, left * size)
+
+        grid = np.zeros((height * size, width * size), dtype=np.int32)
+        for (cy, cx), chunk in zip(coords, tilemap.chunks.values()):
+            cells = np.frombuffer(chunk.collision_grid, dtype=np.uint8).reshape(size, size)
+            y, x = (cy - top) * size, (cx - left) * size
+            grid[y : y + size, x : x + size] = cells
+
+        self.__sat = np.zeros((grid.shape[0] + 1, grid.shape[1] + 1), dtype=np.int32)
+        self.__sat[1:, 1:] = grid.cumsum(0).cumsum(1)
+
+    def __cells(self, left, top, right, bottom):
+        """rows [r0, r1) and columns [c0, c1) of the table the pixel box [left, right) x [top, bottom) overlaps"""
+        tw, th = self.__tile_size
+        origin_row, origin_col = self.__origin
+        rows, cols = self.__sat.shape[0] - 1, self.__sat.shape[1] - 1
+
+        c0 = np.clip(np.floor_divide(left, tw) - origin_col, 0, cols).astype(np.intp)
+        c1 = np.clip(np.floor_divide(right - 1, tw) + 1 - origin_col, 0, cols).astype(np.intp)
+        r0 = np.clip(np.floor_divide(top, th) - origin_row, 0, rows).astype(np.intp)
+        r1 = np.clip(np.floor_divide(bottom - 1, th) + 1 - origin_row, 0, rows).astype(np.intp)
+        return r0, c0, r1, c1
+
+    def __count(self, r0, c0, r1, c1):
+        sat = self.__sat
+        return sat[r1, c1] - sat[r0, c1] - sat[r1, c0] + sat[r0, c0]
+
+    def __solid(self, left, top, right, bottom):
+        """per row, whether any solid tile overlaps the pixel box [left, right) x [top, bottom)"""
+        r0, c0, r1, c1 = self.__cells(left, top, right, bottom)
+        return (self.__count(r0, c0, r1, c1) > 0) & (c1 > c0) & (r1 > r0)
+
+    def __first_solid(self, lo, hi, across0, across1, vertical: bool, lowest: bool):
+        """
+        per row, the lowest (or highest) tile row (vertical) or column in [lo, hi)
+        holding a solid tile within [across0, across1) of the other axis, rows
+        without any get a meaningless index, a binary search over the summed-area
+        table so a hitbox spanning several tiles costs a few passes
+        """
+
+        def solid_in(a, b):
+            if vertical:
+                return self.__count(a, across0, b, across1)
+            return self.__count(across0, a, across1, b)
+
+        first, last = lo, hi - 1
+        for _ in range(int((hi - lo).max(initial=1)).bit_length()):
+            if lowest:
+                mid = (first + last) // 2
+                found = solid_in(lo, mid + 1) > 0
+                last = np.where(found, mid, last)
+                first = np.where(found, first, mid + 1)
+            else:
+                mid = (first + last + 1) // 2
+                found = solid_in(mid, hi) > 0
+                first = np.where(found, mid, first)
+                last = np.where(found, last, mid - 1)
+        return first if lowest else last
+
+    def step(self, tilemap: "Tilemap"):
+        due = [slot for slot, entity in enumerate(self.entities) if entity.sim_dt > 0]
+        count = len(due)
+        if count == 0:
+            return
+        self.__sync_grid(tilemap)
+        tw, th = self.__tile_size
+        origin_row, origin_col = self.__origin
+
+        entities = [self.entities[slot] for slot in due]
+        pos = self.__pos[:count]
+        vel = self.__velocity[:count]
+        offset = self.hitbox_offset[due]
+        size = self.hitbox_size[due]
+        dt = np.fromiter([e.sim_dt for e in entities], float, count)
+        pos[:] = np.fromiter(chain.from_iterable([e.pos for e in entities]), float, 2 * count).reshape(count, 2)
+        vel[:] = np.fromiter(chain.from_iterable([e.velocity for e in entities]), float, 2 * count).reshape(count, 2)
+        gravity = np.fromiter([e.obey_gravity for e in entities], bool, count)
+
+        # flying entities just drift, in px per second
+        flying = ~gravity
+        pos[flying] += vel[flying] * dt[flying, None]
+
+        # horizontal move, then out of the nearest solid column the whole hitbox
+        # overlaps, a step can be longer than a tile at the slower lod tiers
+        pos[gravity, 0] += vel[gravity, 0] * (BASE_SPEED * dt[gravity])
+        # integer hitbox left / top, truncated like pygame.Rect
+        box = np.trunc(pos + offset)
+        left, top = box[:, 0], box[:, 1]
+        right, bottom = left + size[:, 0], top + size[:, 1]
+        r0, c0, r1, c1 = self.__cells(left, top, right, bottom)
+        moving_right = gravity & (vel[:, 0] > 0)
+        moving_left = gravity & (vel[:, 0] < 0)
+        hit = (moving_right | moving_left) & self.__solid(left, top, right, bottom)
+        if hit.any():
+            wall_left = (self.__first_solid(c0, c1, r0, r1, vertical=False, lowest=True) + origin_col) * tw
+            wall_right = (self.__first_solid(c0, c1, r0, r1, vertical=False, lowest=False) + origin_col + 1) * tw
+            pos[:, 0] -= np.where(hit & moving_right, right - wall_left, 0)
+            pos[:, 0] += np.where(hit & moving_left, wall_right - left, 0)
+            vel[hit, 0] = 0
+
+        # gravity, vertical move then the same against the rows
+        vel[gravity, 1] += GRAVITY * dt[gravity]
+        pos[gravity, 1] += vel[gravity, 1] * dt[gravity]
+        box = np.trunc(pos + offset)
+        left, top = box[:, 0], box[:, 1]
+        right, bottom = left + size[:, 0], top + size[:, 1]
+        r0, c0, r1, c1 = self.__cells(left, top, right, bottom)
+        falling = gravity & (vel[:, 1] > 0)
+        rising = gravity & (vel[:, 1] < 0)
+        hit = (falling | rising) & self.__solid(left, top, right, bottom)
+        if hit.any():
+            floor = (self.__first_solid(r0, r1, c0, c1, vertical=True, lowest=True) + origin_row) * th
+            ceiling = (self.__first_solid(r0, r1, c0, c1, vertical=True, lowest=False) + origin_row + 1) * th
+            pos[:, 1] += np.where(hit & falling, floor - bottom, 0)
+            pos[:, 1] += np.where(hit & rising, ceiling - top, 0)
+            vel[hit, 1] = 0
+
+        # contact sides, the hitbox nudged one pixel each way
+        box = np.trunc(pos + offset)
+        left, top = box[:, 0], box[:, 1]
+        right, bottom = left + size[:, 0], top + size[:, 1]
+        contacts = self.__contacts[:count]
+        contacts[:, 0] = self.__solid(left - 1, top, right - 1, bottom)
+        contacts[:, 1] = self.__solid(left + 1, top, right + 1, bottom)
+        contacts[:, 2] = self.__solid(left, top - 1, right, bottom - 1)
+        contacts[:, 3] = self.__solid(left, top + 1, right, bottom + 1)
+
+        for entity, new_pos, new_vel, (left_side, right_side, up_side, down_side) in zip(
+            entities, pos.tolist(), vel.tolist(), contacts.tolist()
+        ):
+            entity.pos[:] = new_pos
+            entity.velocity[:] = new_vel
+            sides = entity.contact_sides
+            sides["left"], sides["right"], sides["up"], sides["down"] = left_side, right_side, up_side, down_side
+
+
+def _create_store() -> Optional[EntityStore]:
+    if not ENTITY_SOA_BACKEND:
+        return None
+    if np is None:
+        logger.warning("ENTITY_SOA_BACKEND needs numpy, falling back to per entity physics")
+        return None
+    return EntityStore()
+
+
+entity_store: Optional[EntityStore] = _create_store()
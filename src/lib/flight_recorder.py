@@ -0,0 +1,155 @@
+import json
+import sys
+import threading
+import time
+from collections import Counter, deque
+from pathlib import Path
+from time import perf_counter
+from types import CodeType
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from constants import (
+    FLIGHT_RECORDER_BUDGET,
+    FLIGHT_RECORDER_INTERVAL,
+    FLIGHT_RECORDER_MAX_DUMPS,
+    FLIGHT_RECORDER_PATH,
+    FLIGHT_RECORDER_WINDOW,
+)
+from logger import logger
+
+# innermost first (code, line) pairs, only turned into text for frames that get dumped
+TStack = Tuple[Tuple[CodeType, int], ...]
+MAX_STACK_DEPTH = 64
+
+
+def format_stack(stack: TStack) -> List[str]:
+    """outermost call first, the way flame graphs read"""
+    return [f"{Path(code.co_filename).name}:{line} {code.co_qualname}" for code, line in reversed(stack)]
+
+
+class FlightRecorder:
+    """
+    samples the main thread's stack from a timer thread into a rolling window,
+    when a frame takes longer than the budget the samples taken during that
+    frame are written to disk together with a summary of the game state,
+    the sampler thread also does the writing so a dump does not stall the
+    next frame
+    """
+
+    def __init__(self, budget: float, interval: float, window: float, max_dumps: int, directory: Path) -> None:
+        self.budget = budget
+        self.interval = interval
+        self.max_dumps = max_dumps
+        self.directory = directory
+        # (perf_counter, stack) of the last window seconds
+        self.samples: Deque[Tuple[float, TStack]] = deque(maxlen=max(int(window / interval), 1))
+        self.frames = 0
+        self.spikes = 0
+        self.__summary: Optional[Callable[[], Dict[str, Any]]] = None
+        self.__pending: List[Dict[str, Any]] = []
+        self.__thread: Optional[threading.Thread] = None
+        self.__stop = threading.Event()
+        self.__target_id = 0
+        self.__frame_start = 0.0
+        self.__open = False
+        self.__stamp = ""
+
+    @property
+    def running(self) -> bool:
+        return self.__thread is not None
+
+    def start(self, summary: Callable[[], Dict[str, Any]]):
+        """samples the calling thread, summary() describes the game state of a slow frame"""
+        if self.__thread is not None:
+            return
+        self.__summary = summary
+        self.__target_id = threading.get_ident()
+        self.__stamp = time.strftime("%Y%m%d_%H%M%S")
+        self.__stop.clear()
+        self.__thread = threading.Thread(target=self.__run, name="flight-recorder", daemon=True)
+        self.__thread.start()
+        logger.info(f"flight recorder sampling every {self.interval * 1000:.1f}ms, budget {self.budget * 1000:.1f}ms")
+
+    def stop(self):
+        """stops sampling and writes the dumps still queued"""
+        if self.__thread is None:
+            return
+        self.__stop.set()
+        self.__thread.join()
+        self.__thread = None
+        self.__write_pending()
+        if self.spikes:
+            logger.info(f"flight recorder: {self.spikes} of {self.frames} frames over budget")
+
+    def begin_frame(self):
+        """closes the frame in progress, the time until the next end_frame or begin_frame is one frame"""
+        if self.__thread is None:
+            return
+        self.end_frame()
+        self.__open = True
+        self.__frame_start = perf_counter()
+
+    def end_frame(self):
+        if not self.__open:
+            return
+        self.__open = False
+        end = perf_counter()
+        start = self.__frame_start
+        self.frames += 1
+        if end - start <= self.budget:
+            return
+
+        self.spikes += 1
+        if self.spikes > self.max_dumps:
+            return
+        samples = [stack for stamp, stack in list(self.samples) if start <= stamp <= end]
+        summary = self.__summary() if self.__summary is not None else {}
+        self.__pending.append(
+            {
+                "frame": self.frames - 1,
+                "duration_ms": (end - start) * 1000,
+                "budget_ms": self.budget * 1000,
+                "state": summary,
+                "samples": samples,
+            }
+        )
+
+    def __run(self):
+        target_id = self.__target_id
+        samples = self.samples
+        while not self.__stop.wait(self.interval):
+            frame = sys._current_frames().get(target_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None and len(stack) < MAX_STACK_DEPTH:
+                stack.append((frame.f_code, frame.f_lineno))
+                frame = frame.f_back
+            samples.append((perf_counter(), tuple(stack)))
+            if self.__pending:
+                self.__write_pending()
+
+    def __write_pending(self):
+        while self.__pending:
+            spike = self.__pending.pop(0)
+            stacks = Counter(spike.pop("samples"))
+            spike["sample_count"] = sum(stacks.values())
+            spike["stacks"] = [
+                {"count": count, "stack": format_stack(stack)} for stack, count in stacks.most_common()
+            ]
+            self.directory.mkdir(parents=True, exist_ok=True)
+            path = self.directory / f"spike_{self.__stamp}_{spike['frame']:06d}.json"
+            path.write_text(json.dumps(spike, indent=1))
+            logger.warning(
+                f"frame {spike['frame']} took {spike['duration_ms']:.1f}ms, "
+                f"{spike['sample_count']} samples written to {path}"
+            )
+
+
+flight_recorder = FlightRecorder(
+    FLIGHT_RECORDER_BUDGET,
+    FLIGHT_RECORDER_INTERVAL,
+    FLIGHT_RECORDER_WINDOW,
+    FLIGHT_RECORDER_MAX_DUMPS,
+    FLIGHT_RECORDER_PATH,
+)
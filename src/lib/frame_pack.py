@@ -0,0 +1,114 @@
+import json
+import mmap
+import struct
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterable, List, Optional, Tuple
+
+import pygame
+
+from logger import logger
+
+FRAME_PACK_MAGIC = b"VWPAK"
+FRAME_PACK_VERSION = 1
+FRAME_PACK_NAME = "frames.pack"
+
+# magic, format version, index length, every frame starts on this boundary
+_HEADER = struct.Struct("<5sHI")
+_ALIGN = 64
+
+# frame set hash -> (offset from the data start, width, height) per frame
+TFramePackIndex = Dict[str, List[Tuple[int, int, int]]]
+
+
+def _aligned(offset: int) -> int:
+    return -(-offset // _ALIGN) * _ALIGN
+
+
+def write_frame_pack(pack_path: Path, frame_sets: Iterable[Tuple[str, List[pygame.Surface]]]):
+    """stores every frame as raw RGBA rows, written next to the file and swapped in"""
+    index: TFramePackIndex = {}
+    blobs: List[Tuple[int, bytes]] = []
+    offset = 0
+    for digest, frames in frame_sets:
+        entries = index[digest] = []
+        for frame in frames:
+            pixels = pygame.image.tobytes(frame, "RGBA")
+            entries.append((offset, frame.get_width(), frame.get_height()))
+            blobs.append((offset, pixels))
+            offset = _aligned(offset + len(pixels))
+
+    index_blob = json.dumps(index).encode()
+    data_start = _aligned(_HEADER.size + len(index_blob))
+
+    tmp_path = pack_path.with_suffix(pack_path.suffix + ".tmp")
+    with open(tmp_path, "wb") as pack_file:
+        pack_file.write(_HEADER.pack(FRAME_PACK_MAGIC, FRAME_PACK_VERSION, len(index_blob)))
+        pack_file.write(index_blob)
+        for blob_offset, pixels in blobs:
+            pack_file.seek(data_start + blob_offset)
+            pack_file.write(pixels)
+        pack_file.truncate(data_start + offset)
+    tmp_path.replace(pack_path)
+
+
+class FramePack:
+    """
+    read side of a frame pack, the file is mapped copy-on-write and frames
+    are surfaces over that mapping, so processes loading the same pack share
+    its pages until something draws into a frame
+    """
+
+    def __init__(self, pack_file: BinaryIO, mapping: mmap.mmap, index: TFramePackIndex, data_start: int) -> None:
+        self.index = index
+        self.__file = pack_file
+        self.__mapping = mapping
+        self.__view = memoryview(mapping)
+        self.__data_start = data_start
+
+    @classmethod
+    def open(cls, pack_path: Path) -> Optional["FramePack"]:
+        """returns None when the pack is missing or from another format version"""
+        if not pack_path.exists():
+            return None
+
+        pack_file = open(pack_path, "rb")
+        try:
+            mapping = mmap.mmap(pack_file.fileno(), 0, access=mmap.ACCESS_COPY)
+        except ValueError:
+            pack_file.close()
+            return None
+
+        magic, version, index_len = _HEADER.unpack_from(mapping)
+        if magic != FRAME_PACK_MAGIC or version != FRAME_PACK_VERSION:
+            mapping.close()
+            pack_file.close()
+            return None
+        try:
+            index = json.loads(mapping[_HEADER.size : _HEADER.size + index_len])
+        except ValueError as e:
+            logger.warning(f"corrupt frame pack {pack_path}: {e}")
+            mapping.close()
+            pack_file.close()
+            return None
+
+        return cls(pack_file, mapping, index, _aligned(_HEADER.size + index_len))
+
+    def __contains__(self, digest: str):
+        return digest in self.index
+
+    def frames(self, digest: str) -> List[pygame.Surface]:
+        """zero copy RGBA surfaces, each keeps the mapping alive for as long as it exists"""
+        surfaces: List[pygame.Surface] = []
+        for offset, width, height in self.index[digest]:
+            start = self.__data_start + offset
+            surfaces.append(pygame.image.frombuffer(self.__view[start : start + width * height * 4], (width, height), "RGBA"))
+        return surfaces
+
+    def close(self):
+        """only releases the file once no surface refers to the mapping anymore"""
+        self.__view.release()
+        try:
+            self.__mapping.close()
+        except BufferError:
+            return
+        self.__file.close()
@@ -0,0 +1,172 @@
+import hashlib
+import pickle
+import struct
+import zlib
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, List, Optional, Tuple
+from xml.etree import ElementTree
+
+from logger import logger
+
+MAP_CACHE_MAGIC = b"VWMAP"
+MAP_CACHE_VERSION = 2
+MAP_CACHE_SUFFIX = ".vwmap"
+
+# magic, format version, sha1 fingerprint of the sources, meta block length
+_HEADER = struct.Struct("<5sH20sI")
+
+# keys the loader reads from the meta block
+_META_KEYS = frozenset(
+    ("tilewidth", "tileheight", "map_width", "map_height", "tile_props", "entities", "tiles", "chunk_index")
+)
+
+# keys the loader reads from a chunk record
+_CHUNK_KEYS = frozenset(("collision_grid", "solid_ids", "decor_ids", "colliders", "spawns"))
+# sources whose edits may keep both size and mtime, hashed by content as well
+_HASHED_SUFFIXES = (".tmx", ".tsx")
+
+TCompiledMap = Dict[str, Any]
+TCompiledChunk = Dict[str, Any]
+
+
+class MapCacheError(Exception):
+    """a chunk record of an opened map cache could not be read back"""
+
+
+def map_sources(tmx_path: Path) -> List[Path]:
+    """tmx file plus every tsx and tileset image it depends on"""
+    sources = [tmx_path]
+    tmx_root = ElementTree.parse(tmx_path).getroot()
+
+    for tileset in tmx_root.iter("tileset"):
+        tsx_source = tileset.get("source")
+        if tsx_source is None:
+            tileset_root = tileset
+            base_dir = tmx_path.parent
+        else:
+            tsx_path = (tmx_path.parent / tsx_source).resolve()
+            sources.append(tsx_path)
+            tileset_root = ElementTree.parse(tsx_path).getroot()
+            base_dir = tsx_path.parent
+
+        for image in tileset_root.iter("image"):
+            image_source = image.get("source")
+            if image_source is not None:
+                sources.append((base_dir / image_source).resolve())
+
+    return sources
+
+
+def map_fingerprint(tmx_path: Path, tile_scale: float, chunk_size: int) -> bytes:
+    digest = hashlib.sha1(f"{MAP_CACHE_VERSION}:{tile_scale}:{chunk_size}".encode())
+    for source in map_sources(tmx_path):
+        stat = source.stat()
+        digest.update(f"{source.name}:{stat.st_mtime_ns}:{stat.st_size}".encode())
+        if source.suffix in _HASHED_SUFFIXES:
+            digest.update(hashlib.sha1(source.read_bytes()).digest())
+    return digest.digest()
+
+
+def _pack(data: Any) -> bytes:
+    return zlib.compress(pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL), 1)
+
+
+class MapCacheReader:
+    """
+    random access to a compiled map, the meta block is read up front and
+    chunk records are read one at a time through the index stored in it
+    """
+
+    def __init__(self, cache_file: BinaryIO, meta: TCompiledMap, data_start: int) -> None:
+        self.meta = meta
+        self.__file = cache_file
+        self.__data_start = data_start
+
+    @classmethod
+    def open(cls, cache_path: Path, fingerprint: bytes) -> Optional["MapCacheReader"]:
+        """returns None when the artifact is missing, stale, unreadable or from another format version"""
+        if not cache_path.exists():
+            return None
+
+        cache_file = open(cache_path, "rb")
+        meta = None
+        try:
+            header = cache_file.read(_HEADER.size)
+            if len(header) != _HEADER.size:
+                return None
+            magic, version, cached_fingerprint, meta_len = _HEADER.unpack(header)
+            if magic != MAP_CACHE_MAGIC or version != MAP_CACHE_VERSION or cached_fingerprint != fingerprint:
+                return None
+            meta = pickle.loads(zlib.decompress(cache_file.read(meta_len)))
+            if not isinstance(meta, dict) or not _META_KEYS.issubset(meta):
+                raise ValueError("meta block is missing keys")
+        except Exception as e:
+            # a truncated or half written artifact is only a cache miss, the tmx is parsed again
+            logger.warning(f"unreadable map cache {cache_path}: {e!r}")
+            meta = None
+            return None
+        finally:
+            if meta is None:
+                cache_file.close()
+
+        return cls(cache_file, meta, _HEADER.size + meta_len)
+
+    def chunk_keys(self):
+        return self.meta["chunk_index"].keys()
+
+    def read_chunk(self, key: int) -> Optional[TCompiledChunk]:
+        """raises MapCacheError when the record is truncated or corrupt"""
+        location = self.meta["chunk_index"].get(key)
+        if location is None:
+            return None
+        offset, length = location
+        try:
+            self.__file.seek(self.__data_start + offset)
+            record = pickle.loads(zlib.decompress(self.__file.read(length)))
+            if not isinstance(record, dict) or not _CHUNK_KEYS.issubset(record):
+                raise ValueError("chunk record is missing keys")
+        except Exception as e:
+            raise MapCacheError(f"unreadable chunk {key} in map cache: {e!r}") from e
+        return record
+
+    def close(self):
+        self.__file.close()
+
+
+def write_map_cache(cache_path: Path, fingerprint: bytes, meta: TCompiledMap, chunks: Dict[int, TCompiledChunk]):
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+
+    chunk_index: Dict[int, Tuple[int, int]] = {}
+    chunk_blobs: List[bytes] = []
+    offset = 0
+    for key, chunk in chunks.items():
+        blob = _pack(chunk)
+        chunk_index[key] = (offset, len(blob))
+        chunk_blobs.append(blob)
+        offset += len(blob)
+    meta_blob = _pack({**meta, "chunk_index": chunk_index})
+
+    tmp_path = cache_path.with_suffix(cache_path.suffix + ".tmp")
+    with open(tmp_path, "wb") as cache_file:
+        cache_file.write(_HEADER.pack(MAP_CACHE_MAGIC, MAP_CACHE_VERSION, fingerprint, len(meta_blob)))
+        cache_file.write(meta_blob)
+        for blob in chunk_blobs:
+            cache_file.write(blob)
+    tmp_path.replace(cache_path)
+
+
+if __name__ == "__main__":
+    import pygame
+
+    from constants import MAP_PATH, TILEMAP_CHUNK_SIZE, TILEMAP_SCALE
+    from lib.tilemap import Tilemap
+
+    pygame.init()
+    pygame.display.set_mode((1, 1), pygame.HIDDEN)
+
+    for tmx_path in sorted(MAP_PATH.glob("*.tmx")):
+        if not tmx_path.stem.isdigit():
+            continue
+        tilemap = Tilemap(tile_scale=TILEMAP_SCALE, chunk_size=TILEMAP_CHUNK_SIZE, use_map_cache=True)
+        if tilemap.load_map(int(tmx_path.stem)):
+            logger.info(f"compiled {tmx_path.name}")
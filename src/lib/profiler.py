@@ -0,0 +1,169 @@
+import csv
+import json
+import time
+from array import array
+from math import ceil
+from pathlib import Path
+from time import perf_counter
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+from constants import PROFILER_DUMP_PATH, PROFILER_ENABLED, PROFILER_FRAMES
+from logger import logger
+
+if TYPE_CHECKING:
+    from pygame import Surface
+
+PERCENTILES = (0.5, 0.95, 0.99)
+# phases shown by the overlay, the slowest by p95 first
+OVERLAY_LINES = 12
+# frames between two overlay refreshes, sorting the rings and rendering the text each frame would show up in the profile
+OVERLAY_REFRESH = 30
+
+
+def percentile(ordered: List[float], q: float) -> float:
+    """nearest rank percentile of an ascending list"""
+    if not ordered:
+        return 0.0
+    return ordered[max(ceil(q * len(ordered)) - 1, 0)]
+
+
+class FrameProfiler:
+    """
+    per frame seconds spent in each named phase, kept for the last capacity
+    frames in one ring buffer per phase, a frame is cut into phases by
+    calling lap() after each of them so a phase costs one perf_counter call,
+    class attributed phases like "update.Bat" break a phase down and are
+    not added to the frame total, a frame ends when the next one begins
+    """
+
+    def __init__(self, capacity: int, enabled: bool) -> None:
+        self.capacity = capacity
+        self.enabled = enabled
+        self.show_overlay = False
+        # frames recorded so far, the ring slot of a frame is frames % capacity
+        self.frames = 0
+        self.__rings: Dict[str, array] = {}
+        self.__current: Dict[str, float] = {}
+        self.__class_phases: Dict[Tuple[str, type], str] = {}
+        self.__last = 0.0
+        self.__open = False
+        self.__overlay: List["Surface"] = []
+        self.__overlay_frame = -OVERLAY_REFRESH
+
+    def begin_frame(self):
+        """closes the frame in progress and starts timing the next one"""
+        if not self.enabled:
+            return
+        self.end_frame()
+        self.__current.clear()
+        self.__open = True
+        self.__last = perf_counter()
+
+    def set_enabled(self, enabled: bool):
+        if not enabled:
+            self.end_frame()
+        self.enabled = enabled
+
+    def lap(self, phase: str):
+        """charges the time since the previous lap, or begin_frame, to phase"""
+        if not self.__open:
+            return
+        now = perf_counter()
+        current = self.__current
+        current[phase] = current.get(phase, 0.0) + now - self.__last
+        self.__last = now
+
+    def attribute(self, kind: str, cls: type, seconds: float):
+        """adds seconds to the "kind.ClassName" breakdown phase"""
+        if not self.__open:
+            return
+        key = (kind, cls)
+        phase = self.__class_phases.get(key)
+        if phase is None:
+            phase = self.__class_phases[key] = f"{kind}.{cls.__name__}"
+        current = self.__current
+        current[phase] = current.get(phase, 0.0) + seconds
+
+    def end_frame(self):
+        if not self.__open:
+            return
+        self.__open = False
+        slot = self.frames % self.capacity
+        rings = self.__rings
+        current = self.__current
+        for phase in current:
+            if phase not in rings:
+                rings[phase] = array("d", bytes(8 * self.capacity))
+        for phase, ring in rings.items():
+            ring[slot] = current.get(phase, 0.0)
+        self.frames += 1
+
+    def phases(self) -> List[str]:
+        return list(self.__rings)
+
+    def samples(self, phase: str) -> List[float]:
+        """seconds per recorded frame, oldest first"""
+        ring = self.__rings.get(phase)
+        if ring is None:
+            return []
+        if self.frames <= self.capacity:
+            return ring[: self.frames].tolist()
+        slot = self.frames % self.capacity
+        return ring[slot:].tolist() + ring[:slot].tolist()
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """p50 / p95 / p99 / max / mean per phase in ms"""
+        result: Dict[str, Dict[str, float]] = {}
+        for phase in self.__rings:
+            ordered = sorted(self.samples(phase))
+            if not ordered:
+                continue
+            summary = {f"p{round(q * 100)}": percentile(ordered, q) * 1000 for q in PERCENTILES}
+            summary["max"] = ordered[-1] * 1000
+            summary["mean"] = sum(ordered) / len(ordered) * 1000
+            result[phase] = summary
+        return result
+
+    def draw_overlay(self):
+        """pushes the slowest phases into pydebug, drawn with the next Debug.draw_all"""
+        if not (self.enabled and self.show_overlay):
+            return
+        from pydebug import pgdebug_render, pgdebug_surface
+
+        if self.frames - self.__overlay_frame >= OVERLAY_REFRESH:
+            self.__overlay_frame = self.frames
+            ranked = sorted(self.stats().items(), key=lambda item: item[1]["p95"], reverse=True)
+            self.__overlay = [
+                pgdebug_render(
+                    f"{phase:<22} p50 {summary['p50']:6.2f}  p95 {summary['p95']:6.2f}"
+                    f"  p99 {summary['p99']:6.2f}  max {summary['max']:6.2f} ms"
+                )
+                for phase, summary in ranked[:OVERLAY_LINES]
+            ]
+        for priority, line in enumerate(self.__overlay):
+            pgdebug_surface(line, priority=-priority)
+
+    def dump(self, directory: Path = PROFILER_DUMP_PATH) -> Optional[Tuple[Path, Path]]:
+        """writes every recorded frame as csv and the percentiles as json, returns both paths"""
+        if self.frames == 0:
+            return None
+        directory.mkdir(parents=True, exist_ok=True)
+        stem = directory / time.strftime("profile_%Y%m%d_%H%M%S")
+
+        phases = self.phases()
+        columns = [self.samples(phase) for phase in phases]
+        first_frame = self.frames - len(columns[0])
+        csv_path = stem.with_suffix(".csv")
+        with open(csv_path, "w", newline="") as csv_file:
+            writer = csv.writer(csv_file)
+            writer.writerow(["frame", *(f"{phase}_ms" for phase in phases)])
+            for row, values in enumerate(zip(*columns)):
+                writer.writerow([first_frame + row, *(f"{value * 1000:.4f}" for value in values)])
+
+        json_path = stem.with_suffix(".json")
+        json_path.write_text(json.dumps({"frames": len(columns[0]), "phases": self.stats()}, indent=1))
+        logger.info(f"profile of {len(columns[0])} frames written to {csv_path} and {json_path}")
+        return csv_path, json_path
+
+
+profiler = FrameProfiler(PROFILER_FRAMES, PROFILER_ENABLED)
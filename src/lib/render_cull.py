@@ -0,0 +1,56 @@
+from typing import Dict, List, Set
+
+from pygame import Rect
+
+from constants import RENDER_CULL_MARGIN
+from lib.spatial_hash import SpatialHash
+from ttypes.index_type import TPosType
+
+
+class RenderCuller:
+    """
+    world space camera rect of the frame being drawn, renderables whose
+    bounds miss it are skipped, drawn / culled are counted per group
+    """
+
+    def __init__(self, margin: int) -> None:
+        self.margin = margin
+        self.view = Rect(0, 0, 0, 0)
+        # group -> [drawn, culled] of the current frame
+        self.counters: Dict[str, List[int]] = {}
+
+    def begin(self, offset: TPosType, size: TPosType):
+        """called once per frame before anything is drawn"""
+        margin = self.margin
+        self.view.update(int(offset[0]) - margin, int(offset[1]) - margin, size[0] + 2 * margin, size[1] + 2 * margin)
+        for counter in self.counters.values():
+            counter[0] = counter[1] = 0
+
+    def __counter(self, group: str) -> List[int]:
+        counter = self.counters.get(group)
+        if counter is None:
+            counter = self.counters[group] = [0, 0]
+        return counter
+
+    def visible(self, group: str, bounds: Rect) -> bool:
+        is_visible = self.view.colliderect(bounds)
+        self.__counter(group)[0 if is_visible else 1] += 1
+        return is_visible
+
+    def query(self, index: SpatialHash) -> Set:
+        """objects of index on screen, the caller records what it drew from them"""
+        return set(index.query_rect(self.view))
+
+    def record(self, group: str, drawn: int, culled: int):
+        counter = self.__counter(group)
+        counter[0] += drawn
+        counter[1] += culled
+
+    def drawn(self, group: str) -> int:
+        return self.__counter(group)[0]
+
+    def culled(self, group: str) -> int:
+        return self.__counter(group)[1]
+
+
+render_cull = RenderCuller(RENDER_CULL_MARGIN)
@@ -0,0 +1,132 @@
+import hashlib
+import struct
+import zlib
+from pathlib import Path
+from typing import TYPE_CHECKING, List, Optional, Sequence
+
+import pygame
+
+if TYPE_CHECKING:
+    from game import Game
+
+REPLAY_MAGIC = b"VWRPL"
+REPLAY_VERSION = 1
+
+# keys gameplay reads, bit i of a tick's input mask is INPUT_KEYS[i]
+INPUT_KEYS = (
+    pygame.K_LEFT,
+    pygame.K_RIGHT,
+    pygame.K_UP,
+    pygame.K_SPACE,
+    pygame.K_f,
+    pygame.K_RETURN,
+    pygame.K_h,
+)
+_KEY_BITS = {key: bit for bit, key in enumerate(INPUT_KEYS)}
+
+# magic, format version, seed, tick rate, ticks, compressed body length
+_HEADER = struct.Struct("<5sHIHII")
+STATE_HASH_SIZE = 8
+
+_VEC = struct.Struct("<dd")
+_ENTITY = struct.Struct("<Idddd?")
+
+
+class Controls:
+    """
+    the keys gameplay sees for the current tick, latched once per tick from
+    the keyboard or from a replay, indexable like pygame.key.get_pressed()
+    """
+
+    def __init__(self) -> None:
+        self.mask = 0
+        self.playback: Optional[Sequence[int]] = None
+        self.tick = 0
+
+    def next_tick(self) -> Optional[int]:
+        """latches and returns this tick's mask, None once the playback ran out"""
+        if self.playback is not None:
+            if self.tick >= len(self.playback):
+                return None
+            self.mask = self.playback[self.tick]
+        else:
+            pressed = pygame.key.get_pressed()
+            mask = 0
+            for bit, key in enumerate(INPUT_KEYS):
+                if pressed[key]:
+                    mask |= 1 << bit
+            self.mask = mask
+        self.tick += 1
+        return self.mask
+
+    def get_pressed(self):
+        return self
+
+    def __getitem__(self, key: int) -> bool:
+        bit = _KEY_BITS.get(key)
+        return bit is not None and bool(self.mask >> bit & 1)
+
+
+controls = Controls()
+
+
+class Replay:
+    """
+    a recorded session, the seed plus one input mask and one state hash per
+    tick, played back it reproduces the run and points at the first tick
+    whose state came out different
+    """
+
+    def __init__(self, seed: int, tick_rate: int) -> None:
+        self.seed = seed
+        self.tick_rate = tick_rate
+        self.inputs = bytearray()
+        self.hashes: List[bytes] = []
+
+    def __len__(self):
+        return len(self.inputs)
+
+    def record(self, mask: int, state: bytes):
+        self.inputs.append(mask)
+        self.hashes.append(state)
+
+    def save(self, path: Path):
+        body = zlib.compress(bytes(self.inputs) + b"".join(self.hashes), 9)
+        header = _HEADER.pack(REPLAY_MAGIC, REPLAY_VERSION, self.seed, self.tick_rate, len(self.inputs), len(body))
+        path.write_bytes(header + body)
+
+    @classmethod
+    def load(cls, path: Path) -> "Replay":
+        data = path.read_bytes()
+        magic, version, seed, tick_rate, ticks, body_len = _HEADER.unpack_from(data)
+        if magic != REPLAY_MAGIC or version != REPLAY_VERSION:
+            raise ValueError(f"{path} is not a version {REPLAY_VERSION} replay")
+
+        body = zlib.decompress(data[_HEADER.size : _HEADER.size + body_len])
+        replay = cls(seed, tick_rate)
+        replay.inputs = bytearray(body[:ticks])
+        replay.hashes = [body[ticks + i * STATE_HASH_SIZE : ticks + (i + 1) * STATE_HASH_SIZE] for i in range(ticks)]
+        return replay
+
+
+def state_hash(game: "Game") -> bytes:
+    """digest of everything a tick can change, player, entities in spawn order and projectiles"""
+    from entities.base_entity import BaseEntity
+    from entities.projectile.fire import FireProjectile
+
+    digest = hashlib.blake2b(digest_size=STATE_HASH_SIZE)
+    player = game.player
+    digest.update(_VEC.pack(*player.pos))
+    digest.update(_VEC.pack(*player.velocity))
+    digest.update(_VEC.pack(player.stats["health"], player.stats["mana"]))
+    digest.update(player.get_state().encode())
+
+    for entity in BaseEntity.get_instances():
+        velocity = getattr(entity, "velocity", pygame.Vector2())
+        digest.update(_ENTITY.pack(entity.uid, *entity.pos, *velocity, entity.alive))
+        digest.update(_VEC.pack(entity.stats["health"], entity.animation.time))
+        digest.update(entity.get_state().encode())
+
+    for projectile in FireProjectile.get_instances():
+        digest.update(_VEC.pack(*projectile.pos))
+    return digest.digest()
@@ -0,0 +1,34 @@
+from random import Random
+from typing import Dict
+
+# particles spawned by gameplay, consumed once per simulation tick
+RNG_PARTICLES = "particles"
+# purely visual noise drawn while rendering, its own stream so the frame rate cannot shift gameplay streams
+RNG_FX = "fx"
+
+
+class RngStreams:
+    """
+    one Random per subsystem, all derived from a single seed so a run can be
+    reproduced while a subsystem drawing more or fewer numbers leaves the
+    other streams untouched
+    """
+
+    def __init__(self, seed: int = 0) -> None:
+        self.seed = seed
+        self.__streams: Dict[str, Random] = {}
+
+    def __getitem__(self, name: str) -> Random:
+        stream = self.__streams.get(name)
+        if stream is None:
+            stream = self.__streams[name] = Random(f"{self.seed}:{name}")
+        return stream
+
+    def reseed(self, seed: int):
+        """restarts every stream from seed"""
+        self.seed = seed
+        for name, stream in self.__streams.items():
+            stream.seed(f"{seed}:{name}")
+
+
+rng = RngStreams()
@@ -0,0 +1,87 @@
+from typing import TYPE_CHECKING, Dict, Iterable, List, Sequence, Tuple
+
+from constants import SIM_LOD_MAX_DT, SIM_LOD_TIERS
+from ttypes.index_type import TPosType
+
+if TYPE_CHECKING:
+    from entities.base_entity import BaseEntity
+
+# (max distance from the focus in px, simulate every n ticks), past the last tier entities sleep
+TLodTiers = Sequence[Tuple[float, int]]
+
+
+class SimLod:
+    """
+    decides per tick which entities simulate and with what dt, based on their
+    distance to the focus (the player), far entities update every few ticks
+    with the time they skipped and the farthest ones sleep, moving into a
+    nearer tier always wakes an entity on that same tick
+    """
+
+    def __init__(self, tiers: TLodTiers, max_dt: float) -> None:
+        self.tiers = tuple((distance * distance, interval) for distance, interval in tiers)
+        self.max_dt = max_dt
+        self.dormant_tier = len(self.tiers)
+        # tier, dt skipped so far, phase spreading a tier's updates over its interval
+        self.__state: Dict["BaseEntity", List] = {}
+        self.__next_phase = 0
+        self.__tick = 0
+        # entities per tier in the last schedule, the last slot counts sleepers
+        self.tier_counts = [0] * (self.dormant_tier + 1)
+
+    def __len__(self):
+        return len(self.__state)
+
+    def tier_of(self, entity: "BaseEntity") -> int:
+        state = self.__state.get(entity)
+        return state[0] if state is not None else 0
+
+    def __tier_at(self, dist_sq: float) -> int:
+        for tier, (max_dist_sq, _) in enumerate(self.tiers):
+            if dist_sq <= max_dist_sq:
+                return tier
+        return self.dormant_tier
+
+    def schedule(self, entities: Iterable["BaseEntity"], focus: TPosType, dt: float):
+        """sets sim_dt of every entity, 0 means it does not update this tick"""
+        self.__tick += 1
+        counts = self.tier_counts
+        counts[:] = [0] * len(counts)
+        fx, fy = focus
+
+        for entity in entities:
+            state = self.__state.get(entity)
+            if state is None:
+                # new entities start awake in the nearest tier
+                state = self.__state[entity] = [0, 0.0, self.__next_phase]
+                self.__next_phase += 1
+
+            dx = entity.pos[0] - fx
+            dy = entity.pos[1] - fy
+            tier = self.__tier_at(dx * dx + dy * dy)
+            counts[tier] += 1
+
+            if tier == self.dormant_tier:
+                # frozen, no time is owed once it wakes up again
+                state[0], state[1] = tier, 0.0
+                entity.sim_dt = 0.0
+                continue
+
+            woke = tier < state[0]
+            state[0] = tier
+            state[1] += dt
+            interval = self.tiers[tier][1]
+            if woke or interval <= 1 or (self.__tick + state[2]) % interval == 0:
+                entity.sim_dt = min(state[1], self.max_dt)
+                state[1] = 0.0
+            else:
+                entity.sim_dt = 0.0
+
+    def remove(self, entity: "BaseEntity"):
+        self.__state.pop(entity, None)
+
+    def clear(self):
+        self.__state.clear()
+
+
+sim_lod = SimLod(SIM_LOD_TIERS, SIM_LOD_MAX_DT)
@@ -0,0 +1,118 @@
+from math import ceil, floor
+from typing import Dict, Generic, Hashable, List, Set, Tuple, TypeVar
+
+from pygame import Rect
+
+from constants import SPATIAL_HASH_CELL_SIZE
+from ttypes.index_type import TPosType
+
+T = TypeVar("T", bound=Hashable)
+
+TCellRange = Tuple[int, int, int, int]
+
+
+class SpatialHash(Generic[T]):
+    """
+    uniform grid broadphase, every object is stored in each cell its bounds
+    overlap and only moves between cells when that range of cells changes
+    """
+
+    def __init__(self, cell_size: int) -> None:
+        self.cell_size = cell_size
+        self.__cells: Dict[Tuple[int, int], Set[T]] = {}
+        self.__ranges: Dict[T, TCellRange] = {}
+        self.__bounds: Dict[T, Rect] = {}
+
+    def __len__(self):
+        return len(self.__bounds)
+
+    def __contains__(self, obj: T):
+        return obj in self.__bounds
+
+    def __cell_range(self, rect: Rect) -> TCellRange:
+        size = self.cell_size
+        return (
+            rect.left // size,
+            rect.top // size,
+            (rect.right - 1) // size,
+            (rect.bottom - 1) // size,
+        )
+
+    def update(self, obj: T, bounds: Rect):
+        """inserts obj or moves it to its new bounds"""
+        stored = self.__bounds.get(obj)
+        if stored is None:
+            self.__bounds[obj] = Rect(bounds)
+        else:
+            stored.update(bounds)
+
+        cell_range = self.__cell_range(bounds)
+        old_range = self.__ranges.get(obj)
+        if old_range == cell_range:
+            return
+
+        if old_range is not None:
+            self.__unlink(obj, old_range)
+        self.__ranges[obj] = cell_range
+        left, top, right, bottom = cell_range
+        for y in range(top, bottom + 1):
+            for x in range(left, right + 1):
+                self.__cells.setdefault((x, y), set()).add(obj)
+
+    def remove(self, obj: T):
+        cell_range = self.__ranges.pop(obj, None)
+        if cell_range is None:
+            return
+        del self.__bounds[obj]
+        self.__unlink(obj, cell_range)
+
+    def __unlink(self, obj: T, cell_range: TCellRange):
+        left, top, right, bottom = cell_range
+        for y in range(top, bottom + 1):
+            for x in range(left, right + 1):
+                cell = self.__cells.get((x, y))
+                if cell is None:
+                    continue
+                cell.discard(obj)
+                if not cell:
+                    del self.__cells[(x, y)]
+
+    def clear(self):
+        self.__cells.clear()
+        self.__ranges.clear()
+        self.__bounds.clear()
+
+    def query_rect(self, area: Rect) -> List[T]:
+        """objects whose bounds overlap area"""
+        found: List[T] = []
+        seen: Set[T] = set()
+        left, top, right, bottom = self.__cell_range(area)
+        for y in range(top, bottom + 1):
+            for x in range(left, right + 1):
+                cell = self.__cells.get((x, y))
+                if cell is None:
+                    continue
+                for obj in cell:
+                    if obj in seen:
+                        continue
+                    seen.add(obj)
+                    if self.__bounds[obj].colliderect(area):
+                        found.append(obj)
+        return found
+
+    def query_radius(self, center: TPosType, radius: float) -> List[T]:
+        """objects whose bounds come within radius of center"""
+        cx, cy = center
+        left, top = floor(cx - radius), floor(cy - radius)
+        area = Rect(left, top, ceil(cx + radius) - left + 1, ceil(cy + radius) - top + 1)
+        found: List[T] = []
+        for obj in self.query_rect(area):
+            bounds = self.__bounds[obj]
+            dx = max(bounds.left - cx, 0, cx - bounds.right)
+            dy = max(bounds.top - cy, 0, cy - bounds.bottom)
+            if dx * dx + dy * dy <= radius * radius:
+                found.append(obj)
+        return found
+
+
+entity_index: SpatialHash = SpatialHash(SPATIAL_HASH_CELL_SIZE)
@@ -1,11 +1,46 @@
-from typing import Tuple
+from array import array
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+from pygame import Rect, Surface
+
+if TYPE_CHECKING:
+    from entities.base_entity import BaseEntity
 
 
 AREA_TILE_BORDER_COLOR = (39, 59, 58, 255)
 AREA_TILE_COLOR = (59, 137, 135, 255)
 
+# cell values of TileChunk.collision_grid
+TILE_EMPTY = 0
+TILE_SOLID = 1
+
+TSpawnKey = Tuple[str, int, int]
+
 
 class Tile:
     def __init__(self, tile_id: int, pos: Tuple[int, int]) -> None:
         self.tile_id = tile_id
         self.pos = pos
+
+
+class TileChunk:
+    """square block of size * size cells, local cell (x, y) lives at y * size + x"""
+
+    def __init__(self, key: int, size: int) -> None:
+        self.key = key
+        self.collision_grid = bytearray(size * size)
+        self.solid_ids = array("I", [0]) * (size * size)
+        self.decor_ids = array("I", [0]) * (size * size)
+
+        self.colliders: List[Rect] = []
+        self.spawns: Dict[str, List[Tuple[int, int]]] = {}
+        self.surface: Optional[Surface] = None
+
+        self.live_entities: List[Tuple[TSpawnKey, "BaseEntity"]] = []
+        self.last_used = 0
+
+    def nbytes(self) -> int:
+        size = len(self.collision_grid) + self.solid_ids.itemsize * (len(self.solid_ids) + len(self.decor_ids))
+        if self.surface is not None:
+            size += self.surface.get_bytesize() * self.surface.get_width() * self.surface.get_height()
+        return size
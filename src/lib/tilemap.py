@@ -1,5 +1,7 @@
+from array import array
 from collections import defaultdict
-from typing import TYPE_CHECKING, DefaultDict, Dict, List, Tuple, TypedDict
+from pathlib import Path
+from typing import TYPE_CHECKING, DefaultDict, Dict, List, Optional, Set, Tuple, TypedDict
 
 import pygame
 from pygame import Rect, Surface
@@ -8,13 +10,24 @@ from pytmx import TiledMap, TiledObjectGroup, TiledTileLayer, load_pygame
 from pytmx.pytmx import Point
 
 from constants import (
+    MAP_CACHE_PATH,
     MAP_PATH,
     SCREEN_HEIGHT,
     SCREEN_WIDTH,
 )
-from lib.tile import Tile
+from lib.map_cache import (
+    MAP_CACHE_SUFFIX,
+    MapCacheError,
+    MapCacheReader,
+    TCompiledChunk,
+    TCompiledMap,
+    map_fingerprint,
+    write_map_cache,
+)
+from lib.tile import TILE_SOLID, TileChunk, TSpawnKey
 from logger import logger
 from ttypes.index_type import TPosType
+from utils.atlas import TAtlasRegion, atlas_region, pack_frames
 
 if TYPE_CHECKING:
     from game import Game
@@ -34,64 +47,300 @@ class Tilemap:
         self.tile_props: Dict[int, TileProps] = {}
 
         self.tile_scale = kwargs.get("tile_scale", 1)
-        self.grid_tiles: Dict[Tuple[int, int], "Tile"] = {}
-        self.grid_optional_collision_tiles: Dict[Tuple[int, int], "Tile"] = {}
+        # side length in tiles of the chunks the world is split into
+        self.chunk_size: int = kwargs.get("chunk_size", 8)
+        # pre-render every chunk into one surface instead of drawing tile by tile
+        self.bake_chunks: bool = kwargs.get("bake_chunks", True)
+        self.use_map_cache: bool = kwargs.get("use_map_cache", False)
+
+        # streaming keeps only chunks around the focus point in memory, needs the map cache
+        self.streaming: bool = kwargs.get("streaming", False)
+        self.stream_radius: int = kwargs.get("stream_radius", 2)
+        self.stream_loads_per_frame: int = kwargs.get("stream_loads_per_frame", 2)
+        self.chunk_budget_bytes: int = kwargs.get("chunk_budget_bytes", 64 * 1024 * 1024)
+
+        self.map_width = 0
+        self.map_height = 0
+        self.chunks_width = 0
+        self.chunks_height = 0
+        # loaded chunks keyed by cy * chunks_width + cx
+        self.chunks: Dict[int, TileChunk] = {}
+        # bumped whenever chunks are loaded or evicted, lets derived grids know when to rebuild
+        self.chunks_version = 0
 
         self.tile_cache: Dict[int, Surface] = {}
+        self.tile_regions: Dict[int, TAtlasRegion] = {}
         self.object_cache: Dict[int, Surface] = {}
         self.entities: DefaultDict[str, List[Tuple[int, int]]] = defaultdict(list)
 
-    def get_physics_rects(self, area: Rect) -> List[Rect]:
-        rects: List[Rect] = []
+        self.__reader: Optional[MapCacheReader] = None
+        self.__map_id = 0
+        # keys of the chunks the streamed map has tiles in, loaded or not
+        self.__stored_chunks: Set[int] = set()
+        self.__stream_frame = 0
+        self.__loaded_bytes = 0
+        self.__dead_spawns: Set[TSpawnKey] = set()
+        # scratch rect of get_physics_rects
+        self.__physics_query = Rect(0, 0, 0, 0)
+
+    def get_physics_rects(self, area: Rect, out: Optional[List[Rect]] = None) -> List[Rect]:
+        """
+        returns the shared merged colliders near area, callers must not mutate
+        them, out is overwritten in place instead of building a new list so its
+        buffer is kept between calls
+        """
         tw, th = self.tilewidth, self.tileheight
+        chunk_w = self.chunk_size * tw
+        chunk_h = self.chunk_size * th
+        query = self.__physics_query
+        query.update(area)
+        query.inflate_ip(2 * tw, 2 * th)
 
-        start_x = int(area.left // tw) - 1
-        end_x = int(area.right // tw) + 1
-        start_y = int(area.top // th) - 1
-        end_y = int(area.bottom // th) + 1
+        start_x = max(int(query.left // chunk_w), 0)
+        end_x = min(int(query.right // chunk_w), self.chunks_width - 1)
+        start_y = max(int(query.top // chunk_h), 0)
+        end_y = min(int(query.bottom // chunk_h), self.chunks_height - 1)
 
-        for y in range(start_y, end_y + 1):
-            for x in range(start_x, end_x + 1):
-                if (x, y) in self.grid_tiles:
-                    rects.append(pygame.Rect(x * tw, y * th, tw, th))
+        rects: List[Rect] = [] if out is None else out
+        count = 0
+        # index loops, unlike range / list iterators they allocate nothing once warm
+        y = start_y
+        while y <= end_y:
+            row = y * self.chunks_width
+            x = start_x
+            while x <= end_x:
+                chunk = self.chunks.get(row + x)
+                x += 1
+                if chunk is None:
+                    continue
+                colliders = chunk.colliders
+                i = 0
+                while i < len(colliders):
+                    collider = colliders[i]
+                    i += 1
+                    if collider.colliderect(query):
+                        if count < len(rects):
+                            rects[count] = collider
+                        else:
+                            rects.append(collider)
+                        count += 1
+            y += 1
+        del rects[count:]
         return rects
 
     def is_solid_tile(self, pos: TPosType):
         x = int(pos[0] // self.tilewidth)
         y = int(pos[1] // self.tileheight)
-        return (x, y) in self.grid_tiles
+        if not (0 <= x < self.map_width and 0 <= y < self.map_height):
+            return False
+
+        size = self.chunk_size
+        chunk = self.chunks.get((y // size) * self.chunks_width + x // size)
+        if chunk is None:
+            return False
+        return chunk.collision_grid[(y % size) * size + x % size] == TILE_SOLID
+
+    def is_area_loaded(self, area: Rect) -> bool:
+        """
+        False while a chunk get_physics_rects would look at for area is still
+        waiting to be streamed in, its tiles would read as empty until then
+        """
+        if not self.__stored_chunks:
+            return True
+        tw, th = self.tilewidth, self.tileheight
+        chunk_w = self.chunk_size * tw
+        chunk_h = self.chunk_size * th
+        start_x = max(int((area.left - tw) // chunk_w), 0)
+        end_x = min(int((area.right + tw) // chunk_w), self.chunks_width - 1)
+        start_y = max(int((area.top - th) // chunk_h), 0)
+        end_y = min(int((area.bottom + th) // chunk_h), self.chunks_height - 1)
+        for y in range(start_y, end_y + 1):
+            row = y * self.chunks_width
+            for x in range(start_x, end_x + 1):
+                if row + x not in self.chunks and row + x in self.__stored_chunks:
+                    return False
+        return True
 
     def load_map(self, map_id: int):
         map_path = MAP_PATH / f"{map_id}.tmx"
         try:
-            map_data = load_pygame(str(map_path))
-            self.tilewidth = int(map_data.tilewidth * self.tile_scale)
-            self.tileheight = int(map_data.tileheight * self.tile_scale)
-
-            for layer in map_data.layers:
-                if isinstance(layer, TiledTileLayer):
-                    self.__load_tile_layer(layer, map_data)
-                elif isinstance(layer, TiledObjectGroup):
-                    self.__load_object_layer(layer, map_data)
+            self.__reset()
+            self.__map_id = map_id
+            if self.use_map_cache or self.streaming:
+                self.__load_cached(map_path, MAP_CACHE_PATH / f"{map_id}{MAP_CACHE_SUFFIX}")
+            else:
+                self.__load_tmx(map_path)
+                self.__finish_chunks()
+            self.chunks_version += 1
             return True
         except Exception as e:
             logger.error(e)
             return False
 
+    def __reset(self):
+        self.tile_props.clear()
+        self.tile_cache.clear()
+        self.tile_regions.clear()
+        self.entities.clear()
+        self.chunks.clear()
+        self.__loaded_bytes = 0
+        self.__dead_spawns.clear()
+        self.__stored_chunks.clear()
+        if self.__reader is not None:
+            self.__reader.close()
+            self.__reader = None
+
+    def __set_dimensions(self, tilewidth: int, tileheight: int, map_width: int, map_height: int):
+        self.tilewidth = tilewidth
+        self.tileheight = tileheight
+        self.map_width = map_width
+        self.map_height = map_height
+        self.chunks_width = -(-map_width // self.chunk_size)
+        self.chunks_height = -(-map_height // self.chunk_size)
+
+    def __load_tmx(self, map_path: Path):
+        map_data = load_pygame(str(map_path))
+        self.__set_dimensions(
+            int(map_data.tilewidth * self.tile_scale),
+            int(map_data.tileheight * self.tile_scale),
+            map_data.width,
+            map_data.height,
+        )
+
+        for layer in map_data.layers:
+            if isinstance(layer, TiledTileLayer):
+                self.__load_tile_layer(layer, map_data)
+            elif isinstance(layer, TiledObjectGroup):
+                self.__load_object_layer(layer, map_data)
+
+        for chunk in self.chunks.values():
+            self.__build_colliders(chunk)
+        self.__pack_tiles()
+
+    def __pack_tiles(self):
+        """moves every tile into shared atlas pages so tiles blit in batches from few sources"""
+        gids = list(self.tile_cache)
+        self.tile_cache = dict(zip(gids, pack_frames([self.tile_cache[gid] for gid in gids])))
+        self.tile_regions = {gid: atlas_region(surf) for gid, surf in self.tile_cache.items()}
+
+    def __load_cached(self, map_path: Path, cache_path: Path):
+        fingerprint = map_fingerprint(map_path, self.tile_scale, self.chunk_size)
+        reader = MapCacheReader.open(cache_path, fingerprint)
+        if reader is None:
+            logger.info(f"compiling {map_path.name} into {cache_path.name}")
+            self.__load_tmx(map_path)
+            meta, chunks = self.__compile()
+            write_map_cache(cache_path, fingerprint, meta, chunks)
+            if not self.streaming:
+                self.__finish_chunks()
+                return
+
+            self.__reset()
+            reader = MapCacheReader.open(cache_path, fingerprint)
+            if reader is None:
+                raise RuntimeError(f"failed to read back {cache_path}")
+
+        self.__load_compiled_meta(reader.meta)
+        if self.streaming:
+            self.__reader = reader
+            self.__stored_chunks.update(reader.chunk_keys())
+            return
+
+        try:
+            for key in reader.chunk_keys():
+                self.__insert_chunk(self.__chunk_from_record(key, reader.read_chunk(key)))
+        except MapCacheError as e:
+            # same as an unreadable header, the artifact is dropped and compiled again from the tmx
+            logger.warning(f"{e}, rebuilding {cache_path.name}")
+            reader.close()
+            cache_path.unlink(missing_ok=True)
+            self.__reset()
+            self.__load_cached(map_path, cache_path)
+            return
+        reader.close()
+
+    def __compile(self) -> Tuple[TCompiledMap, Dict[int, TCompiledChunk]]:
+        meta = {
+            "tilewidth": self.tilewidth,
+            "tileheight": self.tileheight,
+            "map_width": self.map_width,
+            "map_height": self.map_height,
+            "tile_props": {gid: {"inflate": tuple(props["inflate"])} for gid, props in self.tile_props.items()},
+            "entities": {etype: list(positions) for etype, positions in self.entities.items()},
+            "tiles": {
+                gid: (surf.get_size(), pygame.image.tobytes(surf, "RGBA")) for gid, surf in self.tile_cache.items()
+            },
+        }
+        chunks = {
+            key: {
+                "collision_grid": bytes(chunk.collision_grid),
+                "solid_ids": chunk.solid_ids.tobytes(),
+                "decor_ids": chunk.decor_ids.tobytes(),
+                "colliders": [tuple(collider) for collider in chunk.colliders],
+                "spawns": chunk.spawns,
+            }
+            for key, chunk in self.chunks.items()
+        }
+        return meta, chunks
+
+    def __load_compiled_meta(self, meta: TCompiledMap):
+        self.__set_dimensions(meta["tilewidth"], meta["tileheight"], meta["map_width"], meta["map_height"])
+        for gid, (size, pixels) in meta["tiles"].items():
+            self.tile_cache[gid] = pygame.image.frombytes(pixels, size, "RGBA").convert_alpha()
+        self.__pack_tiles()
+        for gid, props in meta["tile_props"].items():
+            self.tile_props[gid] = {"inflate": Rect(props["inflate"])}
+        for etype, positions in meta["entities"].items():
+            self.entities[etype].extend(positions)
+
+    def __chunk_from_record(self, key: int, record: TCompiledChunk) -> TileChunk:
+        chunk = TileChunk(key, self.chunk_size)
+        chunk.collision_grid[:] = record["collision_grid"]
+        chunk.solid_ids = array("I", record["solid_ids"])
+        chunk.decor_ids = array("I", record["decor_ids"])
+        chunk.colliders = [Rect(collider) for collider in record["colliders"]]
+        chunk.spawns = record["spawns"]
+        return chunk
+
+    def __insert_chunk(self, chunk: TileChunk):
+        self.__finish_chunk(chunk)
+        self.chunks[chunk.key] = chunk
+        self.chunks_version += 1
+        self.__loaded_bytes += chunk.nbytes()
+
+    def __finish_chunks(self):
+        for chunk in self.chunks.values():
+            self.__finish_chunk(chunk)
+            self.__loaded_bytes += chunk.nbytes()
+
+    def __finish_chunk(self, chunk: TileChunk):
+        if self.bake_chunks:
+            self.__bake_chunk(chunk)
+
+    def __chunk_at(self, x: int, y: int) -> Tuple[TileChunk, int]:
+        """chunk owning tile (x, y), created on demand, and the local cell index"""
+        size = self.chunk_size
+        key = (y // size) * self.chunks_width + x // size
+        chunk = self.chunks.get(key)
+        if chunk is None:
+            chunk = self.chunks[key] = TileChunk(key, size)
+        return chunk, (y % size) * size + x % size
+
     def __load_tile_layer(self, layer: "TiledTileLayer", map_data: "TiledMap"):
         for x, y, surf in layer.tiles():
             gid = layer.data[y][x]
             if gid not in self.tile_cache:
                 self.tile_cache[gid] = pygame.transform.scale_by(surf, self.tile_scale)
-            tile = Tile(gid, (x * self.tilewidth, y * self.tileheight))
+            chunk, index = self.__chunk_at(x, y)
             props = map_data.get_tile_properties_by_gid(gid)
             if props is not None and props.get("no_collision"):
                 if gid not in self.tile_props:
                     cached_surf = self.tile_cache[gid]
                     self.tile_props[gid] = {"inflate": cached_surf.get_bounding_rect()}
-                self.grid_optional_collision_tiles[(x, y)] = tile
+                chunk.decor_ids[index] = gid
             else:
-                self.grid_tiles[(x, y)] = tile
+                chunk.solid_ids[index] = gid
+                chunk.collision_grid[index] = TILE_SOLID
 
     def __load_object_layer(self, layer: "TiledObjectGroup", map_data: "TiledMap"):
         if layer.name == "enemies":
@@ -100,24 +349,224 @@ class Tilemap:
                 pos = int(enemy.x * self.tile_scale), int(enemy.y * self.tile_scale)
                 self.entities[keyname].append((pos))
 
+                tile_x = min(max(pos[0] // self.tilewidth, 0), self.map_width - 1)
+                tile_y = min(max(pos[1] // self.tileheight, 0), self.map_height - 1)
+                chunk, _ = self.__chunk_at(tile_x, tile_y)
+                chunk.spawns.setdefault(keyname, []).append(pos)
+
+    def __build_colliders(self, chunk: TileChunk):
+        """greedy meshing of the chunk collision_grid, rows first then downwards"""
+        size = self.chunk_size
+        grid = chunk.collision_grid
+        merged = bytearray(size * size)
+        tw, th = self.tilewidth, self.tileheight
+        origin_x = (chunk.key % self.chunks_width) * size
+        origin_y = (chunk.key // self.chunks_width) * size
+
+        chunk.colliders = []
+        for y in range(size):
+            for x in range(size):
+                index = y * size + x
+                if grid[index] != TILE_SOLID or merged[index]:
+                    continue
+
+                run = 1
+                while x + run < size and grid[index + run] == TILE_SOLID and not merged[index + run]:
+                    run += 1
+
+                rows = 1
+                while y + rows < size:
+                    row_start = index + rows * size
+                    row = range(row_start, row_start + run)
+                    if not all(grid[i] == TILE_SOLID and not merged[i] for i in row):
+                        break
+                    rows += 1
+
+                for dy in range(rows):
+                    row_start = index + dy * size
+                    merged[row_start : row_start + run] = b"\x01" * run
+
+                chunk.colliders.append(Rect((origin_x + x) * tw, (origin_y + y) * th, run * tw, rows * th))
+
+    def __bake_chunk(self, chunk: TileChunk):
+        """pre-renders both tile layers of the chunk into a single surface"""
+        size = self.chunk_size
+        chunk.surface = None
+        blits: List[Tuple[Surface, IntPoint, Rect]] = []
+        for index in range(size * size):
+            solid_id = chunk.solid_ids[index]
+            decor_id = chunk.decor_ids[index]
+            if not (solid_id or decor_id):
+                continue
+
+            if chunk.surface is None:
+                chunk.surface = Surface((size * self.tilewidth, size * self.tileheight), pygame.SRCALPHA).convert_alpha()
+                chunk.surface.fill((0, 0, 0, 0))
+
+            y, x = divmod(index, size)
+            local_pos = (x * self.tilewidth, y * self.tileheight)
+            for tile_id in (solid_id, decor_id):
+                if tile_id:
+                    page, area = self.tile_regions[tile_id]
+                    blits.append((page, local_pos, area))
+
+        if chunk.surface is not None:
+            chunk.surface.blits(blits, doreturn=False)
+
+    def update_streaming(self, focus: TPosType, max_loads: Optional[int] = -1):
+        """
+        loads the chunks within stream_radius of focus, nearest first and at most
+        max_loads of them (-1 uses stream_loads_per_frame, None loads all), then
+        evicts least recently used chunks outside the radius while over budget
+        """
+        if not self.streaming or self.__reader is None:
+            return
+
+        self.__stream_frame += 1
+        if max_loads == -1:
+            max_loads = self.stream_loads_per_frame
+
+        focus_x = int(focus[0] // (self.chunk_size * self.tilewidth))
+        focus_y = int(focus[1] // (self.chunk_size * self.tileheight))
+        radius = self.stream_radius
+        stored_chunks = self.__reader.meta["chunk_index"]
+
+        missing: List[Tuple[int, int]] = []
+        for y in range(max(focus_y - radius, 0), min(focus_y + radius, self.chunks_height - 1) + 1):
+            for x in range(max(focus_x - radius, 0), min(focus_x + radius, self.chunks_width - 1) + 1):
+                key = y * self.chunks_width + x
+                chunk = self.chunks.get(key)
+                if chunk is not None:
+                    chunk.last_used = self.__stream_frame
+                elif key in stored_chunks:
+                    missing.append((max(abs(x - focus_x), abs(y - focus_y)), key))
+
+        missing.sort()
+        for _, key in missing if max_loads is None else missing[:max_loads]:
+            self.__stream_in(key)
+
+        self.__evict_over_budget()
+
+    def __stream_in(self, key: int):
+        assert self.__reader is not None
+        try:
+            record = self.__reader.read_chunk(key)
+        except MapCacheError as e:
+            logger.warning(f"{e}, rebuilding the map cache")
+            record = self.__read_rebuilt(key)
+        if record is None:
+            return
+
+        chunk = self.__chunk_from_record(key, record)
+        chunk.last_used = self.__stream_frame
+        self.__insert_chunk(chunk)
+
+        for etype, positions in chunk.spawns.items():
+            for pos in positions:
+                spawn_key = (etype, *pos)
+                if spawn_key in self.__dead_spawns:
+                    continue
+                entity = self.game.spawn_entity(etype, pos)
+                if entity is not None:
+                    chunk.live_entities.append((spawn_key, entity))
+
+    def __read_rebuilt(self, key: int) -> Optional[TCompiledChunk]:
+        """
+        blocking fallback for a cache that went bad mid game, the tmx is compiled
+        again into a fresh cache that streaming then reads from, the chunk stays
+        unloaded when even that fails, entities near it are frozen meanwhile
+        """
+        cache_path = MAP_CACHE_PATH / f"{self.__map_id}{MAP_CACHE_SUFFIX}"
+        if self.__reader is not None:
+            self.__reader.close()
+            self.__reader = None
+        cache_path.unlink(missing_ok=True)
+
+        rebuilt = Tilemap(
+            tile_scale=self.tile_scale, chunk_size=self.chunk_size, bake_chunks=False, use_map_cache=True
+        )
+        if rebuilt.load_map(self.__map_id):
+            fingerprint = map_fingerprint(MAP_PATH / f"{self.__map_id}.tmx", self.tile_scale, self.chunk_size)
+            self.__reader = MapCacheReader.open(cache_path, fingerprint)
+        if self.__reader is None:
+            logger.error(f"could not rebuild {cache_path.name}, streaming stopped")
+            return None
+        try:
+            return self.__reader.read_chunk(key)
+        except MapCacheError as e:
+            logger.error(e)
+            return None
+
+    def __evict_over_budget(self):
+        if self.__loaded_bytes <= self.chunk_budget_bytes:
+            return
+
+        candidates = sorted(
+            (chunk for chunk in self.chunks.values() if chunk.last_used < self.__stream_frame),
+            key=lambda chunk: chunk.last_used,
+        )
+        for chunk in candidates:
+            if self.__loaded_bytes <= self.chunk_budget_bytes:
+                break
+            self.__evict(chunk)
+
+    def __evict(self, chunk: TileChunk):
+        for spawn_key, entity in chunk.live_entities:
+            if entity.alive:
+                entity.remove()
+            else:
+                self.__dead_spawns.add(spawn_key)
+        chunk.live_entities.clear()
+
+        del self.chunks[chunk.key]
+        self.chunks_version += 1
+        self.__loaded_bytes -= chunk.nbytes()
+
     def render(self):
+        if self.bake_chunks:
+            self.__render_chunks()
+            return
+
         surface = self.game.screen
         scroll = self.game.scroll
+        size = self.chunk_size
 
-        start_x = int(scroll.x // self.tilewidth)
-        end_x = int(start_x + (SCREEN_WIDTH // self.tilewidth))
-        start_y = int(scroll.y // self.tileheight)
-        end_y = int(start_y + (SCREEN_HEIGHT // self.tileheight))
-        for y in range(start_y, end_y + 2):
-            for x in range(start_x, end_x + 2):
-                location = (x, y)
-                if location in self.grid_tiles:
-                    tile = self.grid_tiles[location]
-                    pos = tile.pos - scroll
-                    surf = self.tile_cache[tile.tile_id]
-                    surface.blit(surf, pos)
-                if location in self.grid_optional_collision_tiles:
-                    tile = self.grid_optional_collision_tiles[location]
-                    pos = tile.pos - scroll
-                    surf = self.tile_cache[tile.tile_id]
-                    surface.blit(surf, pos)
+        start_x = max(int(scroll.x // self.tilewidth), 0)
+        end_x = min(int(scroll.x // self.tilewidth + (SCREEN_WIDTH // self.tilewidth)) + 1, self.map_width - 1)
+        start_y = max(int(scroll.y // self.tileheight), 0)
+        end_y = min(int(scroll.y // self.tileheight + (SCREEN_HEIGHT // self.tileheight)) + 1, self.map_height - 1)
+        regions = self.tile_regions
+        blits: List[Tuple[Surface, TPosType, Rect]] = []
+        for y in range(start_y, end_y + 1):
+            for x in range(start_x, end_x + 1):
+                chunk = self.chunks.get((y // size) * self.chunks_width + x // size)
+                if chunk is None:
+                    continue
+                index = (y % size) * size + x % size
+                pos = (x * self.tilewidth - scroll.x, y * self.tileheight - scroll.y)
+                solid_id = chunk.solid_ids[index]
+                if solid_id:
+                    page, area = regions[solid_id]
+                    blits.append((page, pos, area))
+                decor_id = chunk.decor_ids[index]
+                if decor_id:
+                    page, area = regions[decor_id]
+                    blits.append((page, pos, area))
+        surface.blits(blits, doreturn=False)
+
+    def __render_chunks(self):
+        surface = self.game.screen
+        scroll = self.game.scroll
+        chunk_w = self.chunk_size * self.tilewidth
+        chunk_h = self.chunk_size * self.tileheight
+
+        start_x = max(int(scroll.x // chunk_w), 0)
+        end_x = min(int((scroll.x + SCREEN_WIDTH) // chunk_w), self.chunks_width - 1)
+        start_y = max(int(scroll.y // chunk_h), 0)
+        end_y = min(int((scroll.y + SCREEN_HEIGHT) // chunk_h), self.chunks_height - 1)
+        for y in range(start_y, end_y + 1):
+            row = y * self.chunks_width
+            for x in range(start_x, end_x + 1):
+                chunk = self.chunks.get(row + x)
+                if chunk is not None and chunk.surface is not None:
+                    surface.blit(chunk.surface, (x * chunk_w - scroll.x, y * chunk_h - scroll.y))
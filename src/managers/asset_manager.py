@@ -1,11 +1,501 @@
-from typing import Dict
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import partial
+from pathlib import Path
+from typing import Dict, Hashable, Iterable, Iterator, List, Optional, Set, Tuple
 
 import pygame
 
-from constants import ASSETS_PATH, PLAYER_SCALE
-from ttypes.index_type import ImageLoadOptions
-from utils.animation import Animation
-from utils.image_utils import load_image, load_images, load_spritesheet
+from constants import (
+    ASSET_BUDGET_BYTES,
+    ASSET_LAZY_LOADING,
+    ASSET_LOADER_WORKERS,
+    ASSET_PINNED_PREFIXES,
+    ASSET_USE_COMPILED,
+    ASSETS_PATH,
+    COMPILED_ASSETS_PATH,
+    PLAYER_SCALE,
+    TEXTURE_ATLAS_SIZE,
+)
+from lib.asset_compiler import TAssetManifest, compiled_entry, load_manifest
+from lib.frame_pack import FRAME_PACK_NAME, FramePack
+from logger import logger
+from ttypes.index_type import AnimationSpec, ImageLoadOptions
+from utils.animation import AnimationClip
+from utils.atlas import pack_frames
+from utils.image_utils import FrameList, TLoadKey, cached_frames, decode_frames, load_image, load_key, share_frames
+
+_PLAYER_OPTIONS: ImageLoadOptions = {"scale_ratio_or_size": PLAYER_SCALE}
+_ENEMY_OPTIONS: ImageLoadOptions = {"scale_ratio_or_size": PLAYER_SCALE, "trim_transparent_pixel": (True, None)}
+_PROJECTILE_OPTIONS: ImageLoadOptions = {"trim_transparent_pixel": (True, None)}
+
+ANIMATION_SPECS: Dict[str, AnimationSpec] = {
+    "projectile/fire": {
+        "source": "projectiles/fireball/move.png",
+        "frame_size": (46, 46),
+        "options": _PROJECTILE_OPTIONS,
+        "animation_speed": 0.2,
+    },
+    "projectile/fire_explosion": {
+        "source": "projectiles/fireball/explosion.png",
+        "frame_size": (46, 46),
+        "options": {**_PROJECTILE_OPTIONS, "scale_ratio_or_size": 2.0},
+        "animation_speed": 0.2,
+        "loop": False,
+    },
+    "player/idle": {
+        "source": "characters/player/idle",
+        "options": {**_PLAYER_OPTIONS, "trim_transparent_pixel": (True, (41, 43, 34, 38))},
+        "animation_speed": 0.2,
+    },
+    "player/idleturn": {
+        "source": "characters/player/idle_turn/idle_turn.png",
+        "frame_size": (128, 128),
+        "options": {**_PLAYER_OPTIONS, "trim_transparent_pixel": (True, None), "flip": (True, False)},
+        "animation_speed": 0.2,
+        "loop": False,
+    },
+    "player/run": {
+        "source": "characters/player/run",
+        "options": {**_PLAYER_OPTIONS, "trim_transparent_pixel": (True, (44, 43, 43, 40))},
+        "animation_speed": 0.2,
+    },
+    "player/jump": {
+        "source": "characters/player/jump",
+        "options": {**_PLAYER_OPTIONS, "trim_transparent_pixel": (True, (44, 36, 41, 55))},
+        "animation_speed": 0.2,
+        "loop": False,
+    },
+    "player/fall": {
+        "source": "characters/player/fall/fall.png",
+        "frame_size": (128, 128),
+        "options": {**_PLAYER_OPTIONS, "trim_transparent_pixel": (True, (44, 36, 41, 55))},
+        "animation_speed": 0.1,
+        "loop": False,
+    },
+    "player/fall_loop": {
+        "source": "characters/player/fall/fall_loop.png",
+        "frame_size": (128, 128),
+        "options": {**_PLAYER_OPTIONS, "trim_transparent_pixel": (True, (44, 36, 41, 55))},
+        "animation_speed": 0.2,
+    },
+    "player/attack": {
+        "source": "characters/player/attack",
+        "options": {**_PLAYER_OPTIONS, "trim_transparent_pixel": (True, (52, 42, 63, 47))},
+        "animation_speed": 0.2,
+        "loop": False,
+    },
+    "player/hit": {
+        "source": "characters/player/hurt/hurt.png",
+        "frame_size": (128, 128),
+        "options": {**_PLAYER_OPTIONS, "trim_transparent_pixel": (True, None), "flip": (True, False)},
+        "animation_speed": 0.2,
+        "loop": False,
+    },
+    "player/wallslide": {
+        "source": "characters/player/wallslide/wallslide.png",
+        "frame_size": (128, 128),
+        "options": {**_PLAYER_OPTIONS, "trim_transparent_pixel": (True, None)},
+        "animation_speed": 0.2,
+        "loop": False,
+    },
+    "player/skillcast": {
+        "source": "characters/player/idle",
+        "options": {**_PLAYER_OPTIONS, "trim_transparent_pixel": (True, (41, 43, 34, 38))},
+        "animation_speed": 0.5,
+        "loop": False,
+    },
+    "bat/fly": {"source": "enemies/bat/fly", "options": _ENEMY_OPTIONS, "animation_speed": 0.2},
+    "bat/chase": {"source": "enemies/bat/fly", "options": _ENEMY_OPTIONS, "animation_speed": 0.2},
+    "bat/attack": {"source": "enemies/bat/attack", "options": _ENEMY_OPTIONS, "animation_speed": 0.2, "loop": False},
+    "bat/hit": {"source": "enemies/bat/hit", "options": _ENEMY_OPTIONS, "animation_speed": 0.2},
+    "mushroom/idle": {"source": "enemies/mushroom/idle.png", "frame_size": (150, 150), "options": _ENEMY_OPTIONS},
+    "mushroom/run": {"source": "enemies/mushroom/run.png", "frame_size": (150, 150), "options": _ENEMY_OPTIONS},
+    "mushroom/hit": {
+        "source": "enemies/mushroom/hit.png",
+        "frame_size": (150, 150),
+        "options": _ENEMY_OPTIONS,
+        "animation_speed": 0.2,
+        "loop": False,
+    },
+    "mushroom/death": {
+        "source": "enemies/mushroom/death.png",
+        "frame_size": (150, 150),
+        "options": _ENEMY_OPTIONS,
+        "animation_speed": 0.05,
+        "loop": False,
+    },
+    "mushroom/attack": {
+        "source": "enemies/mushroom/attack.png",
+        "frame_size": (150, 150),
+        "options": _ENEMY_OPTIONS,
+        "animation_speed": 0.2,
+        "loop": False,
+    },
+    "fireworm/idle": {
+        "source": "enemies/fireworm/idle.png",
+        "frame_size": (90, 90),
+        "options": _ENEMY_OPTIONS,
+        "animation_speed": 0.2,
+    },
+    "fireworm/death": {
+        "source": "enemies/fireworm/death.png",
+        "frame_size": (90, 90),
+        "options": _ENEMY_OPTIONS,
+        "animation_speed": 0.08,
+        "loop": False,
+    },
+    "fireworm/hit": {
+        "source": "enemies/fireworm/hit.png",
+        "frame_size": (90, 90),
+        "options": _ENEMY_OPTIONS,
+        "animation_speed": 0.2,
+        "loop": False,
+    },
+    "fireworm/run": {
+        "source": "enemies/fireworm/run.png",
+        "frame_size": (90, 90),
+        "options": _ENEMY_OPTIONS,
+        "animation_speed": 0.2,
+    },
+    "fireworm/attack": {
+        "source": "enemies/fireworm/attack.png",
+        "frame_size": (90, 90),
+        "options": _ENEMY_OPTIONS,
+        "animation_speed": 0.2,
+        "loop": False,
+    },
+}
+
+
+def _decode_spec(spec: AnimationSpec, compiled: Optional[List[Path]] = None) -> Tuple[List[pygame.Surface], float]:
+    start = time.perf_counter()
+    if compiled is not None:
+        # baked by lib.asset_compiler, the options are already applied
+        frames = [pygame.image.load(path) for path in compiled]
+    else:
+        frames = decode_frames(ASSETS_PATH / spec["source"], spec.get("frame_size"), **spec.get("options", {}))
+    return frames, time.perf_counter() - start
+
+
+def _spec_key(spec: AnimationSpec) -> TLoadKey:
+    return load_key(ASSETS_PATH / spec["source"], spec.get("frame_size"), **spec.get("options", {}))
+
+
+def _asset_group(spec: AnimationSpec) -> str:
+    """player, projectiles or one enemy type, taken from the source path"""
+    parts = Path(spec["source"]).parts
+    return parts[1] if parts[0] == "enemies" else parts[0]
+
+
+# a frame decoded but not yet converted, its spec and the seconds decoding took
+TDecoded = Tuple[AnimationSpec, List[pygame.Surface], float]
+
+
+def frame_backing(frame: pygame.Surface) -> pygame.Surface:
+    """surface owning the pixels of frame, its atlas page for a packed frame"""
+    parent = frame.get_parent()
+    while parent is not None:
+        frame, parent = parent, parent.get_parent()
+    return frame
+
+
+def surface_nbytes(surface: pygame.Surface) -> int:
+    return surface.get_bytesize() * surface.get_width() * surface.get_height()
+
+
+def animation_nbytes(animation: AnimationClip) -> int:
+    """pixel memory the frames of animation keep alive, a shared atlas page counted once"""
+    return sum(surface_nbytes(backing) for backing in {frame_backing(frame) for frame in animation.frames})
+
+
+class AssetStore:
+    """
+    animations by name, built from their spec on first access and kept in LRU
+    order, past budget_bytes the least recently used animations that are not
+    pinned get dropped, those the current level does not spawn first, entities
+    holding a copy keep those frames alive, loaded_bytes counts each backing
+    surface (atlas page or standalone frame) once for as long as any loaded
+    animation uses it, an evicted animation is decoded again on the worker
+    pool and a stand in with its timing plays meanwhile
+    """
+
+    def __init__(
+        self,
+        specs: Dict[str, AnimationSpec],
+        budget_bytes: Optional[int] = None,
+        pinned_prefixes: Tuple[str, ...] = (),
+        atlas_size: int = TEXTURE_ATLAS_SIZE,
+    ) -> None:
+        self.specs = specs
+        # page size of the per group texture atlases, 0 keeps every frame standalone
+        self.atlas_size = atlas_size
+        # frames baked by lib.asset_compiler, used instead of the sources while they are current
+        self.manifest: TAssetManifest = {}
+        self.frame_pack: Optional[FramePack] = None
+        # without a display (or to keep frame pack surfaces mapped and shared between
+        # processes) frames can stay in their loaded format, this also skips the atlas
+        self.convert_frames = True
+        self.budget_bytes = budget_bytes
+        self.pinned_prefixes = pinned_prefixes
+        # animations of the entity types the current level spawns, evicted after every other
+        self.level_prefixes: Tuple[str, ...] = ()
+        self.reload_workers = ASSET_LOADER_WORKERS
+        self.loaded_bytes = 0
+        # seconds spent per animation, decoding plus main thread conversion
+        self.load_timings: Dict[str, float] = {}
+
+        self.__loaded: "OrderedDict[str, AnimationClip]" = OrderedDict()
+        # backing surfaces of each animation and how many loaded animations use each backing
+        self.__backings: Dict[str, Set[pygame.Surface]] = {}
+        self.__backing_users: Dict[pygame.Surface, int] = {}
+        # stand ins of evicted animations, filled in once their reload finishes
+        self.__stand_ins: Dict[str, AnimationClip] = {}
+        self.__reloads: Dict[str, Tuple[TLoadKey, "Future[Tuple[List[pygame.Surface], float]]"]] = {}
+        self.__pool: Optional[ThreadPoolExecutor] = None
+        self.__blank: Optional[pygame.Surface] = None
+        self.__over_budget = False
+
+    def __getitem__(self, name: str) -> AnimationClip:
+        animation = self.__loaded.get(name)
+        if animation is not None:
+            self.__loaded.move_to_end(name)
+            return animation
+
+        stand_in = self.__stand_ins.get(name)
+        if stand_in is not None:
+            self.__reload(name)
+            # frames still shared with a loaded animation or mapped from the frame pack come back at once
+            return self.__loaded.get(name, stand_in)
+
+        if name not in self.specs:
+            raise KeyError(name)
+        logger.debug(f"loading {name} on first use")
+        self.load((name,))
+        return self.__loaded[name]
+
+    def __contains__(self, name: str):
+        return name in self.specs
+
+    def __len__(self):
+        return len(self.__loaded)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.__loaded)
+
+    def is_loaded(self, name: str) -> bool:
+        return name in self.__loaded
+
+    def is_pinned(self, name: str) -> bool:
+        return name.startswith(self.pinned_prefixes)
+
+    def load(self, names: Iterable[str], workers: int = 0) -> None:
+        """
+        png decoding and the trim / flip / scale options run on a thread pool,
+        only convert_alpha needs the display and stays on the main thread
+        """
+        pending = [name for name in dict.fromkeys(names) if name not in self.__loaded]
+        if not pending:
+            return
+
+        start = time.perf_counter()
+        keys = {name: _spec_key(self.specs[name]) for name in pending}
+        frames_by_key, loaded, to_decode, compiled = self.__sources(keys)
+
+        if workers > 1 and len(to_decode) > 1:
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="asset") as pool:
+                decoded = list(pool.map(_decode_spec, to_decode.values(), compiled.values()))
+        else:
+            decoded = [_decode_spec(spec, compiled[key]) for key, spec in to_decode.items()]
+        for (key, spec), (frames, decode_time) in zip(to_decode.items(), decoded):
+            loaded[key] = (spec, frames, decode_time)
+        self.__finish(keys, frames_by_key, loaded)
+
+        if len(pending) > 1:
+            logger.info(
+                f"loaded {len(pending)} animations in {(time.perf_counter() - start) * 1000:.1f}ms "
+                f"({max(workers, 1)} workers, slowest {max(pending, key=self.load_timings.__getitem__)})"
+            )
+        self.__evict_over_budget(keep=set(pending))
+
+    def __sources(
+        self, keys: Dict[str, TLoadKey]
+    ) -> Tuple[
+        Dict[TLoadKey, FrameList],
+        Dict[TLoadKey, TDecoded],
+        Dict[TLoadKey, AnimationSpec],
+        Dict[TLoadKey, Optional[List[Path]]],
+    ]:
+        """
+        frames still cached, frames mapped from the frame pack and the specs left
+        to decode with their compiled frame files (None decodes the source)
+        """
+        frames_by_key: Dict[TLoadKey, FrameList] = {}
+        loaded: Dict[TLoadKey, TDecoded] = {}
+        to_decode: Dict[TLoadKey, AnimationSpec] = {}
+        compiled: Dict[TLoadKey, Optional[List[Path]]] = {}
+        for name, key in keys.items():
+            frames = cached_frames(key)
+            if frames is not None:
+                frames_by_key[key] = frames
+                continue
+            if key in to_decode or key in loaded:
+                continue
+
+            spec = self.specs[name]
+            entry = compiled_entry(self.manifest, name, spec) if self.manifest else None
+            if entry is not None and self.frame_pack is not None and entry["hash"] in self.frame_pack:
+                map_start = time.perf_counter()
+                loaded[key] = (spec, self.frame_pack.frames(entry["hash"]), time.perf_counter() - map_start)
+            else:
+                to_decode[key] = spec
+                compiled[key] = [COMPILED_ASSETS_PATH / frame for frame in entry["frames"]] if entry else None
+        return frames_by_key, loaded, to_decode, compiled
+
+    def __finish(
+        self, keys: Dict[str, TLoadKey], frames_by_key: Dict[TLoadKey, FrameList], loaded: Dict[TLoadKey, TDecoded]
+    ) -> None:
+        """converts and packs the decoded frames on the main thread, then builds the animations"""
+        decode_times: Dict[TLoadKey, float] = {}
+        convert = self.convert_frames and pygame.display.get_surface() is not None
+        converted_by_group: Dict[Hashable, Dict[TLoadKey, List[pygame.Surface]]] = {}
+        for key, (spec, frames, decode_time) in loaded.items():
+            convert_start = time.perf_counter()
+            if convert:
+                frames = [frame.convert_alpha() for frame in frames]
+            # under a budget each source gets its own pages, a page shared by a whole
+            # group would stay alive as long as any animation of the group does
+            group = key if self.budget_bytes is not None else _asset_group(spec)
+            converted_by_group.setdefault(group, {})[key] = frames
+            decode_times[key] = decode_time + time.perf_counter() - convert_start
+
+        # each asset group packs the frames it has never seen into its own atlas pages
+        pack = partial(pack_frames, max_size=self.atlas_size) if self.atlas_size and convert else None
+        for converted in converted_by_group.values():
+            frames_by_key.update(share_frames(converted, pack))
+
+        for name, key in keys.items():
+            spec = self.specs[name]
+            frames = frames_by_key[key]
+            animation = self.__stand_ins.pop(name, None)
+            if animation is not None and animation.frames_len == len(frames):
+                # entities already playing the stand in pick up the frames too
+                animation.fill(frames)
+            else:
+                animation = AnimationClip(
+                    name,
+                    frames,
+                    spec.get("animation_speed", 0.1),
+                    spec.get("loop", True),
+                    spec.get("durations"),
+                )
+            self.__loaded[name] = animation
+            self.__track(name, animation)
+            # only the first animation of a shared source pays for decoding it
+            self.load_timings[name] = decode_times.pop(key, 0.0)
+            logger.debug(f"loaded {name}: {animation.frames_len} frames in {self.load_timings[name] * 1000:.1f}ms")
+
+    def __reload(self, name: str) -> None:
+        """brings an evicted animation back, decoding happens on the worker pool and poll() finishes it"""
+        if name in self.__reloads:
+            return
+        keys = {name: _spec_key(self.specs[name])}
+        frames_by_key, loaded, to_decode, compiled = self.__sources(keys)
+        if not to_decode:
+            self.__finish(keys, frames_by_key, loaded)
+            self.__evict_over_budget(keep={name})
+            return
+
+        if self.__pool is None:
+            self.__pool = ThreadPoolExecutor(max_workers=max(self.reload_workers, 1), thread_name_prefix="asset")
+        key, spec = next(iter(to_decode.items()))
+        logger.debug(f"reloading {name} in the background")
+        self.__reloads[name] = (key, self.__pool.submit(_decode_spec, spec, compiled[key]))
+
+    def poll(self) -> None:
+        """finishes the background reloads that are done decoding, on the main thread since it converts"""
+        if not self.__reloads:
+            return
+        for name, (key, future) in list(self.__reloads.items()):
+            if not future.done():
+                continue
+            del self.__reloads[name]
+            if name in self.__loaded:
+                # loaded in the foreground meanwhile
+                continue
+            try:
+                frames, decode_time = future.result()
+            except Exception as e:
+                # the stand in keeps playing, the next access tries again
+                logger.error(f"reloading {name} failed: {e!r}")
+                continue
+            self.__finish({name: key}, {}, {key: (self.specs[name], frames, decode_time)})
+            self.__evict_over_budget(keep={name})
+
+    def close(self) -> None:
+        if self.__pool is not None:
+            self.__pool.shutdown(wait=False, cancel_futures=True)
+            self.__pool = None
+        self.__reloads.clear()
+        if self.frame_pack is not None:
+            self.frame_pack.close()
+            self.frame_pack = None
+
+    def load_prefixes(self, prefixes: Iterable[str], workers: int = 0) -> None:
+        prefixes = tuple(prefixes)
+        self.load((name for name in self.specs if name.startswith(prefixes)), workers)
+
+    def evict(self, name: str) -> None:
+        animation = self.__loaded.pop(name, None)
+        if animation is None:
+            return
+        if self.__blank is None:
+            self.__blank = pygame.Surface((1, 1), pygame.SRCALPHA)
+        self.__stand_ins[name] = animation.stand_in(self.__blank)
+        for backing in self.__backings.pop(name):
+            users = self.__backing_users[backing] - 1
+            if users:
+                self.__backing_users[backing] = users
+            else:
+                del self.__backing_users[backing]
+                self.loaded_bytes -= surface_nbytes(backing)
+
+    def clear(self) -> None:
+        self.__loaded.clear()
+        self.__stand_ins.clear()
+        self.__backings.clear()
+        self.__backing_users.clear()
+        self.loaded_bytes = 0
+
+    def __track(self, name: str, animation: AnimationClip) -> None:
+        backings = self.__backings[name] = {frame_backing(frame) for frame in animation.frames}
+        for backing in backings:
+            users = self.__backing_users.get(backing, 0)
+            if users == 0:
+                self.loaded_bytes += surface_nbytes(backing)
+            self.__backing_users[backing] = users + 1
+
+    def __evict_over_budget(self, keep: Set[str]) -> None:
+        if self.budget_bytes is None or self.loaded_bytes <= self.budget_bytes:
+            self.__over_budget = False
+            return
+        # least recently used first, the animations of the current level only once every other one is gone
+        candidates = [name for name in self.__loaded if name not in keep and not self.is_pinned(name)]
+        candidates.sort(key=lambda name: name.startswith(self.level_prefixes))
+        for name in candidates:
+            if self.loaded_bytes <= self.budget_bytes:
+                break
+            logger.debug(f"evicting {name}")
+            self.evict(name)
+
+        over_budget = self.loaded_bytes > self.budget_bytes
+        if over_budget and not self.__over_budget:
+            logger.warning(
+                f"animations take {self.loaded_bytes / 2**20:.2f}MB, pinned and just loaded ones alone "
+                f"are over the {self.budget_bytes / 2**20:.2f}MB budget"
+            )
+        self.__over_budget = over_budget
 
 
 class AssetManager:
@@ -18,307 +508,44 @@ class AssetManager:
 
     def __init__(self) -> None:
         if not hasattr(self, "assets"):
-            self.assets: Dict[str, Animation] = {}
+            self.assets = AssetStore(ANIMATION_SPECS, pinned_prefixes=ASSET_PINNED_PREFIXES)
         if not hasattr(self, "icons"):
             self.icons: Dict[str, Dict[str, pygame.Surface]] = {}
         if not hasattr(self, "fonts"):
             self.fonts: Dict[str, pygame.Font] = {}
 
-    def load_all(self) -> None:
-        self._load_projectile_assets()
-        self._load_player_assets()
-        self._load_enemy_assets()
+    def load_all(
+        self, workers: Optional[int] = None, lazy: bool = ASSET_LAZY_LOADING, convert_frames: bool = True
+    ) -> None:
+        """
+        lazy only loads the pinned animations and leaves the rest to
+        prefetch_level or first access, under ASSET_BUDGET_BYTES, headless
+        runs pass convert_frames=False so frame pack frames stay zero copy
+        """
+        workers = ASSET_LOADER_WORKERS if workers is None else workers
+        self.assets.reload_workers = workers
+        # convert_alpha needs a display mode, without one frames keep their loaded format
+        self.assets.convert_frames = convert_frames and pygame.display.get_surface() is not None
+        if ASSET_USE_COMPILED:
+            self.assets.manifest = load_manifest()
+            # the pack may have been rebuilt since it was opened
+            if self.assets.frame_pack is not None:
+                self.assets.frame_pack.close()
+            self.assets.frame_pack = FramePack.open(COMPILED_ASSETS_PATH / FRAME_PACK_NAME)
+        if lazy:
+            self.assets.budget_bytes = ASSET_BUDGET_BYTES
+            self.assets.load_prefixes(self.assets.pinned_prefixes, workers)
+        else:
+            self.assets.budget_bytes = None
+            self.assets.load(self.assets.specs, workers)
         self._load_icons()
         self._load_fonts()
 
-    def _load_player_assets(self) -> None:
-        player_path = ASSETS_PATH / "characters" / "player"
-
-        self.assets.update(
-            {
-                "player/idle": Animation(
-                    "player/idle",
-                    load_images(
-                        player_path / "idle",
-                        scale_ratio_or_size=PLAYER_SCALE,
-                        trim_transparent_pixel=(True, (41, 43, 34, 38)),
-                    ),
-                    0.2,
-                ),
-                "player/idleturn": Animation(
-                    "player/idleturn",
-                    load_spritesheet(
-                        player_path / "idle_turn" / "idle_turn.png",
-                        (128, 128),
-                        scale_ratio_or_size=PLAYER_SCALE,
-                        trim_transparent_pixel=(True, None),
-                        flip=(True, False),
-                    ),
-                    animation_speed=0.2,
-                    loop=False,
-                ),
-                "player/run": Animation(
-                    "player/run",
-                    load_images(
-                        player_path / "run",
-                        scale_ratio_or_size=PLAYER_SCALE,
-                        trim_transparent_pixel=(True, (44, 43, 43, 40)),
-                    ),
-                    0.2,
-                ),
-                "player/jump": Animation(
-                    "player/jump",
-                    load_images(
-                        player_path / "jump",
-                        scale_ratio_or_size=PLAYER_SCALE,
-                        trim_transparent_pixel=(True, (44, 36, 41, 55)),
-                    ),
-                    0.2,
-                    False,
-                ),
-                "player/fall": Animation(
-                    "player/fall",
-                    load_spritesheet(
-                        player_path / "fall" / "fall.png",
-                        (128, 128),
-                        scale_ratio_or_size=PLAYER_SCALE,
-                        trim_transparent_pixel=(True, (44, 36, 41, 55)),
-                    ),
-                    0.1,
-                    False,
-                ),
-                "player/fall_loop": Animation(
-                    "player/fall_loop",
-                    load_spritesheet(
-                        player_path / "fall" / "fall_loop.png",
-                        (128, 128),
-                        scale_ratio_or_size=PLAYER_SCALE,
-                        trim_transparent_pixel=(True, (44, 36, 41, 55)),
-                    ),
-                    0.2,
-                    True,
-                ),
-                "player/attack": Animation(
-                    "player/attack",
-                    load_images(
-                        player_path / "attack",
-                        scale_ratio_or_size=PLAYER_SCALE,
-                        trim_transparent_pixel=(True, ((52, 42, 63, 47))),
-                    ),
-                    0.2,
-                    False,
-                ),
-                "player/hit": Animation(
-                    "player/hit",
-                    load_spritesheet(
-                        player_path / "hurt" / "hurt.png",
-                        (128, 128),
-                        scale_ratio_or_size=PLAYER_SCALE,
-                        trim_transparent_pixel=(True, None),
-                        flip=(True, False),
-                    ),
-                    animation_speed=0.2,
-                    loop=False,
-                ),
-                "player/wallslide": Animation(
-                    "player/wallslide",
-                    load_spritesheet(
-                        player_path / "wallslide" / "wallslide.png",
-                        (128, 128),
-                        scale_ratio_or_size=PLAYER_SCALE,
-                        trim_transparent_pixel=(True, None),
-                    ),
-                    0.2,
-                    False,
-                ),
-                "player/skillcast": Animation(
-                    "player/skillcast",
-                    load_images(
-                        player_path / "idle",
-                        scale_ratio_or_size=PLAYER_SCALE,
-                        trim_transparent_pixel=(True, (41, 43, 34, 38)),
-                    ),
-                    0.5,
-                    False,
-                ),
-            }
-        )
-
-    def _load_enemy_assets(self) -> None:
-        self.assets.update(
-            {
-                "bat/fly": Animation(
-                    "bat/fly",
-                    load_images(
-                        ASSETS_PATH / "enemies" / "bat" / "fly",
-                        scale_ratio_or_size=PLAYER_SCALE,
-                        trim_transparent_pixel=(True, None),
-                    ),
-                    0.2,
-                    True,
-                ),
-                "bat/chase": Animation(
-                    "bat/chase",
-                    load_images(
-                        ASSETS_PATH / "enemies" / "bat" / "fly",
-                        scale_ratio_or_size=PLAYER_SCALE,
-                        trim_transparent_pixel=(True, None),
-                    ),
-                    0.2,
-                    True,
-                ),
-                "bat/attack": Animation(
-                    "bat/attack",
-                    load_images(
-                        ASSETS_PATH / "enemies" / "bat" / "attack",
-                        scale_ratio_or_size=PLAYER_SCALE,
-                        trim_transparent_pixel=(True, None),
-                    ),
-                    0.2,
-                    False,
-                ),
-                "bat/hit": Animation(
-                    "bat/hit",
-                    load_images(
-                        ASSETS_PATH / "enemies" / "bat" / "hit",
-                        scale_ratio_or_size=PLAYER_SCALE,
-                        trim_transparent_pixel=(True, None),
-                    ),
-                    0.2,
-                    True,
-                ),
-                "mushroom/idle": Animation(
-                    "mushroom/idle",
-                    load_spritesheet(
-                        ASSETS_PATH / "enemies" / "mushroom" / "idle.png",
-                        (150, 150),
-                        scale_ratio_or_size=PLAYER_SCALE,
-                        trim_transparent_pixel=(True, None),
-                    )
-                ),
-                "mushroom/run": Animation(
-                    "mushroom/run",
-                    load_spritesheet(
-                        ASSETS_PATH / "enemies" / "mushroom" / "run.png",
-                        (150, 150),
-                        scale_ratio_or_size=PLAYER_SCALE,
-                        trim_transparent_pixel=(True, None),
-                    )
-                ),
-                "mushroom/hit": Animation(
-                    "mushroom/hit",
-                    load_spritesheet(
-                        ASSETS_PATH / "enemies" / "mushroom" / "hit.png",
-                        (150, 150),
-                        scale_ratio_or_size=PLAYER_SCALE,
-                        trim_transparent_pixel=(True, None),
-                    ),
-                    0.2,
-                    False,
-                ),
-                "mushroom/death": Animation(
-                    "mushroom/death",
-                    load_spritesheet(
-                        ASSETS_PATH / "enemies" / "mushroom" / "death.png",
-                        (150, 150),
-                        scale_ratio_or_size=PLAYER_SCALE,
-                        trim_transparent_pixel=(True, None),
-                    ),
-                    0.05,
-                    False,
-                ),
-                "mushroom/attack": Animation(
-                    "mushroom/attack",
-                    load_spritesheet(
-                        ASSETS_PATH / "enemies" / "mushroom" / "attack.png",
-                        (150, 150),
-                        scale_ratio_or_size=PLAYER_SCALE,
-                        trim_transparent_pixel=(True, None),
-                    ),
-                    animation_speed=0.2,
-                    loop=False,
-                ),
-                "fireworm/idle": Animation(
-                    "fireworm/idle",
-                    load_spritesheet(
-                        ASSETS_PATH / "enemies" / "fireworm" / "idle.png",
-                        (90, 90),
-                        scale_ratio_or_size=PLAYER_SCALE,
-                        trim_transparent_pixel=(True, None),
-                    ),
-                    0.2,
-                    True,
-                ),
-                "fireworm/death": Animation(
-                    "fireworm/death",
-                    load_spritesheet(
-                        ASSETS_PATH / "enemies" / "fireworm" / "death.png",
-                        (90, 90),
-                        scale_ratio_or_size=PLAYER_SCALE,
-                        trim_transparent_pixel=(True, None),
-                    ),
-                    0.08,
-                    False,
-                ),
-                "fireworm/hit": Animation(
-                    "fireworm/hit",
-                    load_spritesheet(
-                        ASSETS_PATH / "enemies" / "fireworm" / "hit.png",
-                        (90, 90),
-                        scale_ratio_or_size=PLAYER_SCALE,
-                        trim_transparent_pixel=(True, None),
-                    ),
-                    0.2,
-                    False,
-                ),
-                "fireworm/run": Animation(
-                    "fireworm/run",
-                    load_spritesheet(
-                        ASSETS_PATH / "enemies" / "fireworm" / "run.png",
-                        (90, 90),
-                        scale_ratio_or_size=PLAYER_SCALE,
-                        trim_transparent_pixel=(True, None),
-                    ),
-                    0.2,
-                    True,
-                ),
-                "fireworm/attack": Animation(
-                    "fireworm/attack",
-                    load_spritesheet(
-                        ASSETS_PATH / "enemies" / "fireworm" / "attack.png",
-                        (90, 90),
-                        scale_ratio_or_size=PLAYER_SCALE,
-                        trim_transparent_pixel=(True, None),
-                    ),
-                    0.2,
-                    False,
-                ),
-            }
-        )
-
-    def _load_projectile_assets(self):
-        options: ImageLoadOptions = {"trim_transparent_pixel": (True, None)}
-        explosion_scale = 2.0
-        self.assets.update(
-            {
-                "projectile/fire": Animation(
-                    "projectile/fire",
-                    load_spritesheet(ASSETS_PATH / "projectiles" / "fireball" / "move.png", (46, 46), **options),
-                    animation_speed=0.2,
-                    loop=True,
-                ),
-                "projectile/fire_explosion": Animation(
-                    "projectile/fire_explosion",
-                    load_spritesheet(
-                        ASSETS_PATH / "projectiles" / "fireball" / "explosion.png",
-                        (46, 46),
-                        **{**options, "scale_ratio_or_size": explosion_scale},
-                    ),
-                    animation_speed=0.2,
-                    loop=False,
-                ),
-            }
-        )
+    def prefetch_level(self, entity_types: Iterable[str], workers: Optional[int] = None) -> None:
+        """loads every animation of the entity types a level spawns, e.g. Tilemap.entities"""
+        workers = ASSET_LOADER_WORKERS if workers is None else workers
+        self.assets.level_prefixes = tuple(f"{etype}/" for etype in entity_types)
+        self.assets.load_prefixes(self.assets.level_prefixes, workers)
 
     def _load_icons(self) -> None:
         skills_default_options: ImageLoadOptions = {"trim_transparent_pixel": (True, None)}
@@ -2,6 +2,7 @@ from typing import TYPE_CHECKING, Set
 
 from pygame import Surface
 
+from lib.render_cull import render_cull
 from particle.particles import Particle
 
 if TYPE_CHECKING:
@@ -20,11 +21,13 @@ class ParticleManager:
     def remove(self, particle: Particle):
         self.particles.remove(particle)
 
-    def render(self, surface: Surface, dt: float):
+    def update(self, dt: float):
+        self.particles = {particle for particle in self.particles if not particle.update(dt)}
+
+    def render(self, surface: Surface, alpha: float = 1.0):
         offset = ParticleManager.game.scroll
-        new_particles = set()
+        t = 1.0 - alpha
         for particle in self.particles:
-            if not particle.update(dt):
-                particle.render(surface, offset)
-                new_particles.add(particle)
-        self.particles = new_particles
+            if render_cull.visible("particles", particle.bounds()):
+                # drawn at prev_pos lerped towards pos by alpha
+                particle.render(surface, offset + (particle.pos - particle.prev_pos) * t)
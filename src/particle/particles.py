@@ -1,14 +1,14 @@
 from abc import ABC, abstractmethod
 from math import cos, pi, sin
-from random import randint, random, uniform
 from typing import TYPE_CHECKING, Sequence, Tuple
 
-from pygame import Surface, Vector2
+from pygame import Rect, Surface, Vector2
 from pygame.constants import SRCALPHA
 from pygame.draw import circle as draw_circle
 from pygame.typing import ColorLike
 
-from constants import BASE_SPEED
+from constants import BASE_SPEED, FPS
+from lib.rng import RNG_PARTICLES, rng
 from ttypes.index_type import TPosType
 
 if TYPE_CHECKING:
@@ -25,6 +25,8 @@ class Particle(ABC):
     ) -> None:
         self.ptype = ptype
         self.pos = Vector2(pos)
+        # pos before the last update, render lerps from it
+        self.prev_pos = Vector2(pos)
         self.velocity = Vector2(velocity)
         self.color = color
 
@@ -34,6 +36,10 @@ class Particle(ABC):
     @abstractmethod
     def render(self, surface: Surface, offset: Vector2 | Tuple[int, int]): ...
 
+    @abstractmethod
+    def bounds(self) -> Rect:
+        """world space area render draws into"""
+
 
 class DotParticle(Particle):
     def __init__(
@@ -51,11 +57,17 @@ class DotParticle(Particle):
         self.reduce_factor = reduce_factor
 
     def update(self, dt: float):
+        self.prev_pos.update(self.pos)
         self.pos.x += dt * BASE_SPEED * self.velocity.x
         self.pos.y += dt * BASE_SPEED * self.velocity.y
-        self.radius = max(1, self.radius - self.reduce_factor)
+        # reduce_factor is per frame at FPS
+        self.radius = max(1, self.radius - self.reduce_factor * dt * FPS)
         return self.radius <= 1
 
+    def bounds(self):
+        radius = self.radius
+        return Rect(self.pos.x - radius, self.pos.y - radius, 2 * radius + 1, 2 * radius + 1)
+
     def render(self, surface: Surface, offset: Tuple[int, int] | Vector2):
         draw_circle(surface, self.color, self.pos - offset, self.radius, self.fill_width)
 
@@ -127,7 +139,7 @@ def coned_particles(
     for base_angle in base_angles:
         angle = base_angle
         if base_angle != 0:
-            angle += (pi / 6) * (random() - 0.5)
+            angle += (pi / 6) * (rng[RNG_PARTICLES].random() - 0.5)
 
         spawn_dot_particle(
             group=group,
@@ -156,7 +168,7 @@ def radial_particles(
     angle = 0.0
 
     while angle < full_angle:
-        radius = randint(*radius_range)
+        radius = rng[RNG_PARTICLES].randint(*radius_range)
 
         spawn_dot_particle(
             group=group,
@@ -182,7 +194,7 @@ def spawn_dot_particle(
     color: ColorLike,
     filled: bool,
 ) -> DotParticle:
-    speed = uniform(*speed_range)
+    speed = rng[RNG_PARTICLES].uniform(*speed_range)
     velocity = (cos(angle) * speed, sin(angle) * speed)
 
     particle = DotParticle(
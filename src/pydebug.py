@@ -57,8 +57,16 @@ class Debug:
         _DEBUG_REFS.clear()
 
 
+def pgdebug_render(text: Any) -> pygame.Surface:
+    return font.render(str(text), True, (255, 255, 255))
+
+
 def pgdebug(text: Any, priority=0):
-    textsurf = font.render(str(text), True, (255, 255, 255))
+    pgdebug_surface(pgdebug_render(text), priority)
+
+
+def pgdebug_surface(textsurf: pygame.Surface, priority=0):
+    """stacks a line from pgdebug_render, lines that rarely change can be rendered once and reused"""
     Debug.add(
         {
             "type": "text",
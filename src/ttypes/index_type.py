@@ -13,6 +13,17 @@ class ImageLoadOptions(TypedDict, total=False):
     colorkey: Optional[ColorLike]
 
 
+class AnimationSpec(TypedDict, total=False):
+    # path relative to ASSETS_PATH, a spritesheet when frame_size is set else a directory of frames
+    source: str
+    frame_size: Tuple[int, int]
+    options: ImageLoadOptions
+    animation_speed: float
+    # seconds per frame, overrides the uniform timing of animation_speed
+    durations: Tuple[float, ...]
+    loop: bool
+
+
 class BoxModel(TypedDict, total=False):
     margin_x: int
     margin_y: int
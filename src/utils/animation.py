@@ -1,53 +1,142 @@
-from typing import Sequence
+from bisect import bisect_right
+from itertools import accumulate
+from typing import List, Optional, Sequence
 
-from pygame import Surface
+from pygame import Surface, transform
 
+from constants import FPS
 
-class Animation:
-    # __slots__ = ("frames", "frames_len", "loop", "frame_index", "animation_speed")
 
-    def __init__(self, name: str, frames: Sequence[Surface], animation_speed=0.1, loop=True) -> None:
+class AnimationClip:
+    """
+    immutable frames plus per frame durations in seconds, one instance per
+    asset shared by every entity playing it, animation_speed is the legacy
+    frames-per-tick rate at FPS and sets a uniform duration when no
+    durations are given, only a stand in ever gets its frames filled in
+    """
+
+    __slots__ = (
+        "name",
+        "frames",
+        "frames_len",
+        "sizes",
+        "animation_speed",
+        "durations",
+        "duration",
+        "loop",
+        "__ends",
+        "__flipped",
+    )
+
+    def __init__(
+        self,
+        name: str,
+        frames: Sequence[Surface],
+        animation_speed=0.1,
+        loop=True,
+        durations: Optional[Sequence[float]] = None,
+    ) -> None:
         self.name = name
-        self.loop = loop
-        self.frame_index = 0
         self.frames = frames
         self.frames_len = len(frames)
+        self.sizes = tuple(frame.get_size() for frame in frames)
         self.animation_speed = animation_speed
+        self.durations = tuple(durations) if durations is not None else (1 / (animation_speed * FPS),) * self.frames_len
+        self.loop = loop
+
+        self.__ends = list(accumulate(self.durations))
+        self.duration = self.__ends[-1] if self.__ends else 0.0
+        # horizontally mirrored frames, built on first use
+        self.__flipped: List[Optional[Surface]] = [None] * self.frames_len
+
+    def stand_in(self, blank: Surface) -> "AnimationClip":
+        """
+        same timing and frame sizes with every frame drawn as blank, plays in
+        place of an evicted clip until fill() hands it the reloaded frames
+        """
+        clip = AnimationClip(self.name, [blank] * self.frames_len, durations=self.durations, loop=self.loop)
+        clip.animation_speed = self.animation_speed
+        clip.sizes = self.sizes
+        return clip
+
+    def fill(self, frames: Sequence[Surface]):
+        self.frames = frames
+        self.sizes = tuple(frame.get_size() for frame in frames)
+        self.__flipped = [None] * self.frames_len
+
+    def index_at(self, time: float) -> int:
+        """frame shown at time, frames_len once a clip has played through"""
+        return bisect_right(self.__ends, time)
+
+    def frame(self, index: int, flipped=False) -> Surface:
+        if not flipped:
+            return self.frames[index]
+
+        frame = self.__flipped[index]
+        if frame is None:
+            frame = self.__flipped[index] = transform.flip(self.frames[index], True, False)
+        return frame
+
 
+class Playhead:
+    """
+    per entity position in a shared clip, advanced by dt so playback does not
+    depend on the tick rate, play() swaps clips without allocating
+    """
+
+    __slots__ = ("clip", "time", "loop", "frame_index", "previous_index", "__locked")
+
+    def __init__(self, clip: AnimationClip) -> None:
         self.__locked = False
+        self.play(clip)
+
+    def play(self, clip: AnimationClip):
+        self.clip = clip
+        self.time = 0.0
+        # per entity override, starts from the clip
+        self.loop = clip.loop
+        self.frame_index = 0
+        self.previous_index = -1
 
-    def copy(self):
-        return self.__class__(
-            name=self.name,
-            frames=self.frames,
-            animation_speed=self.animation_speed,
-            loop=self.loop,
-        )
-
-    def get_frame(self):
-        animation_ended = self.has_animation_end()
-        if animation_ended:
-            if not self.loop:
-                return self.frames[self.frames_len - 1]
-            else:
-                return self.frames[0]
-        return self.frames[int(self.frame_index)]
-
-    def update(self):
+    @property
+    def name(self):
+        return self.clip.name
+
+    @property
+    def frames_len(self):
+        return self.clip.frames_len
+
+    def current_frame_index(self):
+        return min(self.frame_index, self.clip.frames_len - 1)
+
+    def get_frame(self, flipped=False):
+        return self.clip.frame(self.current_frame_index(), flipped)
+
+    def frame_size(self):
+        return self.clip.sizes[self.current_frame_index()]
+
+    def entered_frame(self, index: int) -> bool:
+        """true only on the update that moved the playhead onto frame index"""
+        return self.frame_index == index and self.previous_index != index
+
+    def update(self, dt: float):
         if self.__locked:
             return
-        self.frame_index = round(self.frame_index + self.animation_speed, 2)
-        if self.has_animation_end():
-            if self.loop:
-                self.reset_animation()
-            else:
-                self.frame_index = self.frames_len
+        self.previous_index = self.frame_index
+
+        duration = self.clip.duration
+        self.time += dt
+        if self.time >= duration:
+            self.time = self.time % duration if self.loop and duration > 0 else duration
+        self.frame_index = self.clip.index_at(self.time)
 
     def has_animation_end(self):
-        return self.frame_index >= self.frames_len
+        return not self.loop and self.time >= self.clip.duration
 
     def reset_animation(self):
+        self.time = 0.0
         self.frame_index = 0
+        self.previous_index = -1
 
     def lock(self):
         self.__locked = True
@@ -60,4 +149,4 @@ class Animation:
         return self.__locked
 
     def safe_frame_index(self):
-        return int(self.frame_index) % len(self.frames)
+        return self.frame_index % self.clip.frames_len
@@ -0,0 +1,67 @@
+from typing import Dict, List, Sequence, Tuple
+
+import pygame
+from pygame import Rect, Surface
+
+from constants import TEXTURE_ATLAS_SIZE
+
+TAtlasRegion = Tuple[Surface, Rect]
+
+
+def pack_frames(frames: Sequence[Surface], max_size: int = TEXTURE_ATLAS_SIZE, padding: int = 1) -> List[Surface]:
+    """
+    shelf packs frames, tallest first, into as few max_size pages as needed and
+    returns them in input order as subsurfaces of those pages, frames that
+    would not fit an empty page are returned untouched
+    """
+    order = sorted(range(len(frames)), key=lambda i: (-frames[i].get_height(), -frames[i].get_width()))
+
+    # page index and topleft of each packed frame, plus the used extent of each page
+    placements: Dict[int, Tuple[int, int, int]] = {}
+    extents: List[List[int]] = []
+    shelf_x = shelf_y = shelf_h = 0
+    for i in order:
+        w, h = frames[i].get_size()
+        if w + padding > max_size or h + padding > max_size:
+            continue
+
+        if not extents or shelf_x + w > max_size:
+            shelf_x, shelf_y, shelf_h = 0, shelf_y + shelf_h, 0
+        if not extents or shelf_y + h > max_size:
+            extents.append([0, 0])
+            shelf_x = shelf_y = shelf_h = 0
+
+        placements[i] = (len(extents) - 1, shelf_x, shelf_y)
+        extent = extents[-1]
+        extent[0] = max(extent[0], shelf_x + w)
+        extent[1] = max(extent[1], shelf_y + h)
+        shelf_x += w + padding
+        shelf_h = max(shelf_h, h + padding)
+
+    pages: List[Surface] = []
+    for width, height in extents:
+        page = Surface((width, height), pygame.SRCALPHA).convert_alpha()
+        page.fill((0, 0, 0, 0))
+        pages.append(page)
+
+    packed: List[Surface] = []
+    for i, frame in enumerate(frames):
+        placement = placements.get(i)
+        if placement is None:
+            packed.append(frame)
+            continue
+        page_index, x, y = placement
+        page = pages[page_index]
+        # max against a cleared page copies the pixels, alpha included, without blending
+        page.blit(frame, (x, y), special_flags=pygame.BLEND_RGBA_MAX)
+        packed.append(page.subsurface((x, y), frame.get_size()))
+
+    return packed
+
+
+def atlas_region(frame: Surface) -> TAtlasRegion:
+    """page and area of a packed frame, for batched Surface.blits from a single source"""
+    page = frame.get_parent()
+    if page is None:
+        return frame, frame.get_rect()
+    return page, Rect(frame.get_offset(), frame.get_size())
@@ -1,12 +1,27 @@
-from typing import TYPE_CHECKING
+from itertools import chain
+from typing import TYPE_CHECKING, Dict, Sequence, Tuple
 
 from pygame import Vector2
 
 from ttypes.index_type import VectorPos
 from utils.math_utils import sign
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
 if TYPE_CHECKING:
     from entities.base_entity import BaseEntity
+    from entities.enemy_entity import Enemy
+
+# shapes of TRange, how far an attacker reaches its target
+RANGE_RADIAL = 0  # distance <= reach
+RANGE_BOX = 1  # |dx| <= reach and |dy| <= height
+RANGE_MELEE = 2  # attacker rect overlaps the target hitbox
+
+# (shape, reach, height)
+TRange = Tuple[int, float, float]
 
 
 def melee_range(attacker: "BaseEntity", target: "BaseEntity") -> bool:
@@ -29,3 +44,147 @@ def direction(a: VectorPos, b: VectorPos, *, normalize: bool = False, scale=1.0)
     if normalize:
         return (b.pos - a.pos).normalize() * scale
     return Vector2(sign(b.pos.x - a.pos.x), sign(b.pos.y - a.pos.y)) * scale
+
+
+def in_range(attacker: "BaseEntity", target: "BaseEntity", spec: TRange) -> bool:
+    shape, reach, height = spec
+    if shape == RANGE_MELEE:
+        return melee_range(attacker, target)
+    if shape == RANGE_BOX:
+        return horizontal_range(attacker, target, max_x=reach, max_y=height)
+    return radial_range(attacker, target, reach)
+
+
+def is_vulnerable(target: "BaseEntity") -> bool:
+    """target is still recovering from a hit"""
+    hit_timer = getattr(target, "hit_timer", None)
+    return hit_timer is not None and not hit_timer.has_reached_interval()
+
+
+# bumped by every query_targets pass, queries from older passes are stale
+_query_tick = 0
+
+
+class TargetQuery:
+    """
+    an enemy's view of its target for the current tick, the FSMs read these
+    instead of measuring against the target themselves
+    """
+
+    __slots__ = ("dx", "dy", "distance", "direction", "can_chase", "can_attack", "target_vulnerable", "tick")
+
+    def __init__(self) -> None:
+        self.dx = self.dy = self.distance = 0.0
+        self.direction = Vector2()
+        self.can_chase = self.can_attack = self.target_vulnerable = False
+        self.tick = -1
+
+    def is_current(self):
+        return self.tick == _query_tick
+
+    def invalidate(self):
+        self.tick = -1
+
+    def set(self, dx: float, dy: float, distance: float, can_chase: bool, can_attack: bool, target_vulnerable: bool):
+        self.dx, self.dy, self.distance = dx, dy, distance
+        if distance > 0:
+            self.direction.update(dx / distance, dy / distance)
+        else:
+            self.direction.update(0, 0)
+        self.can_chase, self.can_attack, self.target_vulnerable = can_chase, can_attack, target_vulnerable
+        self.tick = _query_tick
+
+    def refresh(self, enemy: "Enemy"):
+        """scalar path, for enemies that missed this tick's query_targets"""
+        target = enemy.target
+        if target is None:
+            self.set(0.0, 0.0, 0.0, False, False, False)
+            return
+        dx = target.pos.x - enemy.pos.x
+        dy = target.pos.y - enemy.pos.y
+        self.set(
+            dx,
+            dy,
+            (dx * dx + dy * dy) ** 0.5,
+            in_range(enemy, target, enemy.chase_range),
+            in_range(enemy, target, enemy.attack_range),
+            is_vulnerable(target),
+        )
+
+
+def _columns(rows, count: int, width: int):
+    return np.fromiter(chain.from_iterable(rows), float, count * width).reshape(count, width)
+
+
+def _check_ranges(shape, reach, height, dx, dy, distance, overlap):
+    radial = (shape == RANGE_RADIAL) & (distance <= reach)
+    box = (shape == RANGE_BOX) & (np.abs(dx) <= reach) & (np.abs(dy) <= height)
+    melee = (shape == RANGE_MELEE) & overlap
+    return radial | box | melee
+
+
+def query_targets(enemies: Sequence["Enemy"]):
+    """
+    fills TargetQuery of every enemy updating this tick in one pass, run
+    after movement, deltas, distances and range checks of all of them are
+    computed as arrays and per target state like vulnerability once per
+    target, enemies the lod skips this tick are left stale
+    """
+    global _query_tick
+    _query_tick += 1
+
+    due = [enemy for enemy in enemies if enemy.alive and enemy.sim_dt > 0]
+    active = [enemy for enemy in due if enemy.target is not None]
+    for enemy in due:
+        if enemy.target is None:
+            enemy.target_query.refresh(enemy)
+    if not active:
+        return
+    if np is None:
+        for enemy in active:
+            enemy.target_query.refresh(enemy)
+        return
+
+    count = len(active)
+    targets = [enemy.target for enemy in active]
+    vulnerable: Dict["BaseEntity", bool] = {}
+    target_boxes: Dict["BaseEntity", Tuple[int, int, int, int]] = {}
+    for target in targets:
+        if target not in vulnerable:
+            vulnerable[target] = is_vulnerable(target)
+            target_boxes[target] = tuple(target.hitbox())
+
+    pos = _columns([enemy.pos for enemy in active], count, 2)
+    delta = _columns([target.pos for target in targets], count, 2) - pos
+    dx, dy = delta[:, 0], delta[:, 1]
+    distance = np.hypot(dx, dy)
+
+    # chase shape, reach, height then attack shape, reach, height
+    ranges = _columns([enemy.chase_range + enemy.attack_range for enemy in active], count, 6)
+
+    # melee, enemy.rect() against the target hitbox, same overlap rules as Rect.colliderect
+    overlap = np.zeros(count, dtype=bool)
+    melee = (ranges[:, 0] == RANGE_MELEE) | (ranges[:, 3] == RANGE_MELEE)
+    if melee.any():
+        size = _columns([enemy.animation.get_frame().size for enemy in active], count, 2)
+        box = _columns([target_boxes[target] for target in targets], count, 4)
+        left, top = np.trunc(pos[:, 0]), np.trunc(pos[:, 1])
+        overlap = (
+            melee
+            & (size[:, 0] > 0)
+            & (size[:, 1] > 0)
+            & (box[:, 2] > 0)
+            & (box[:, 3] > 0)
+            & (left < box[:, 0] + box[:, 2])
+            & (left + size[:, 0] > box[:, 0])
+            & (top < box[:, 1] + box[:, 3])
+            & (top + size[:, 1] > box[:, 1])
+        )
+
+    can_chase = _check_ranges(ranges[:, 0], ranges[:, 1], ranges[:, 2], dx, dy, distance, overlap)
+    can_attack = _check_ranges(ranges[:, 3], ranges[:, 4], ranges[:, 5], dx, dy, distance, overlap)
+
+    for enemy, target, (ex, ey), dist, chase, attack in zip(
+        active, targets, delta.tolist(), distance.tolist(), can_chase.tolist(), can_attack.tolist()
+    ):
+        enemy.target_query.set(ex, ey, dist, chase, attack, vulnerable[target])
@@ -1,7 +1,9 @@
+import hashlib
 import re
 import sys
 from pathlib import Path
-from typing import Dict, Sequence, Tuple, Union, Unpack
+from typing import Callable, Dict, Iterable, Optional, Sequence, Tuple, Union, Unpack
+from weakref import WeakValueDictionary
 
 import pygame
 from pytmx.util_pygame import List
@@ -9,14 +11,87 @@ from pytmx.util_pygame import List
 from logger import logger
 from ttypes.index_type import ImageLoadOptions
 
+# source path, newest mtime_ns among its pngs, frame size of a spritesheet, options
+TLoadKey = Tuple[str, int, Optional[Tuple[int, int]], str]
+
+
+class FrameList(list):
+    """plain list of frames, subclassed only so the loader caches can hold it weakly"""
+
+
+# loaded (converted) results and unique frames, entries live as long as
+# something else still uses them so evicted animations are not pinned here
+_loaded_images: "WeakValueDictionary[TLoadKey, pygame.Surface]" = WeakValueDictionary()
+_loaded_frames: "WeakValueDictionary[TLoadKey, FrameList]" = WeakValueDictionary()
+_unique_frames: "WeakValueDictionary[bytes, pygame.Surface]" = WeakValueDictionary()
+
+
+def load_key(path: Path, frame_size: Optional[Tuple[int, int]] = None, /, **options: Unpack[ImageLoadOptions]) -> TLoadKey:
+    if path.is_dir():
+        mtime = max((p.stat().st_mtime_ns for p in path.iterdir() if p.suffix == ".png"), default=0)
+    else:
+        mtime = path.stat().st_mtime_ns
+    return (str(path), mtime, frame_size, repr(sorted(options.items())))
+
+
+def cached_frames(key: TLoadKey) -> Optional[FrameList]:
+    return _loaded_frames.get(key)
+
+
+def cache_frames(key: TLoadKey, frames: Iterable[pygame.Surface]) -> FrameList:
+    """dedupes converted frames and remembers them under key"""
+    return share_frames({key: list(frames)})[key]
+
+
+def frame_digest(frame: pygame.Surface) -> bytes:
+    digest = hashlib.sha1(pygame.image.tobytes(frame, "RGBA"))
+    digest.update(f"{frame.get_size()}".encode())
+    return digest.digest()
+
+
+def share_frames(
+    frames_by_key: Dict[TLoadKey, List[pygame.Surface]],
+    pack: Optional[Callable[[List[pygame.Surface]], List[pygame.Surface]]] = None,
+) -> Dict[TLoadKey, FrameList]:
+    """
+    swaps every frame for a previously seen frame with the same pixels, frames
+    seen for the first time go through pack (e.g. an atlas) before they are
+    shared, then each list is remembered under its key
+    """
+    digests: Dict[int, bytes] = {}
+    shared: Dict[bytes, pygame.Surface] = {}
+    fresh: Dict[bytes, pygame.Surface] = {}
+    for frames in frames_by_key.values():
+        for frame in frames:
+            digest = digests[id(frame)] = frame_digest(frame)
+            if digest in shared:
+                continue
+            known = _unique_frames.get(digest)
+            if known is None:
+                fresh[digest] = known = frame
+            shared[digest] = known
+
+    if pack is not None and fresh:
+        for digest, packed in zip(list(fresh), pack(list(fresh.values()))):
+            fresh[digest] = shared[digest] = packed
+    _unique_frames.update(fresh)
+
+    result: Dict[TLoadKey, FrameList] = {}
+    for key, frames in frames_by_key.items():
+        result[key] = _loaded_frames[key] = FrameList(shared[digests[id(frame)]] for frame in frames)
+    return result
+
 
 def load_image(path: Path, /, **options: Unpack[ImageLoadOptions]) -> pygame.Surface:
     if not path.exists():
         logger.warning(f"{path} not found")
         sys.exit(1)
 
-    image = pygame.image.load(path).convert_alpha()
-    return apply_image_options(image, **options)
+    key = load_key(path, **options)
+    image = _loaded_images.get(key)
+    if image is None:
+        image = _loaded_images[key] = apply_image_options(pygame.image.load(path).convert_alpha(), **options)
+    return image
 
 
 def load_spritesheet(path: Path, frame_size: Tuple[int, int], /, **options: Unpack[ImageLoadOptions]):
@@ -24,7 +99,16 @@ def load_spritesheet(path: Path, frame_size: Tuple[int, int], /, **options: Unpa
         logger.warning(f"{path} not found")
         sys.exit(1)
 
-    spritesheet = pygame.image.load(path).convert_alpha()
+    key = load_key(path, frame_size, **options)
+    frames = cached_frames(key)
+    if frames is None:
+        frames = cache_frames(key, split_spritesheet(pygame.image.load(path).convert_alpha(), frame_size, **options))
+    return frames
+
+
+def split_spritesheet(
+    spritesheet: pygame.Surface, frame_size: Tuple[int, int], /, **options: Unpack[ImageLoadOptions]
+) -> List[pygame.Surface]:
     if (spritesheet.width % frame_size[0]) != 0:
         logger.warning("width isn't symmetric")
         sys.exit(1)
@@ -45,6 +129,28 @@ def load_spritesheet(path: Path, frame_size: Tuple[int, int], /, **options: Unpa
     return frames
 
 
+def decode_frames(
+    path: Path, frame_size: Optional[Tuple[int, int]] = None, /, **options: Unpack[ImageLoadOptions]
+) -> List[pygame.Surface]:
+    """
+    decodes a spritesheet (frame_size given) or a directory of frames without
+    touching the display, safe to run off the main thread, the caller is
+    expected to convert_alpha the result on the main thread
+    """
+    if not path.exists():
+        logger.warning(f"{path} not found")
+        sys.exit(1)
+
+    if frame_size is not None:
+        return split_spritesheet(pygame.image.load(path), frame_size, **options)
+
+    sorted_paths = sorted(
+        (p for p in path.iterdir() if p.suffix == ".png"),
+        key=get_numeric_sort_key,
+    )
+    return [apply_image_options(pygame.image.load(p), **options) for p in sorted_paths]
+
+
 def load_images(
     dir_path: Path,
     /,
@@ -59,7 +165,11 @@ def load_images(
         key=get_numeric_sort_key,
     )
 
-    return [load_image(path, **options) for path in sorted_paths]
+    key = load_key(dir_path, **options)
+    frames = cached_frames(key)
+    if frames is None:
+        frames = cache_frames(key, (load_image(path, **options) for path in sorted_paths))
+    return frames
 
 
 def load_key_images(
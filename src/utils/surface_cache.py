@@ -0,0 +1,61 @@
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from pygame import BLEND_RGB_MULT, Surface, transform
+
+TVariantKey = Tuple[Surface, bool, int, Optional[Tuple[int, int, int]]]
+
+
+class SurfaceVariantCache:
+    """
+    bounded LRU of mirrored, translucent or tinted copies of shared frames,
+    alpha is quantized into alpha_buckets levels so effects that pick a
+    random alpha every frame keep reusing a handful of surfaces
+    """
+
+    def __init__(self, max_size: int = 256, alpha_buckets: int = 8) -> None:
+        self.max_size = max_size
+        self.alpha_buckets = alpha_buckets
+        self.__variants: "OrderedDict[TVariantKey, Surface]" = OrderedDict()
+
+    def __len__(self):
+        return len(self.__variants)
+
+    def quantize_alpha(self, alpha: int) -> int:
+        steps = self.alpha_buckets - 1
+        bucket = round(max(0, min(alpha, 255)) * steps / 255)
+        return int(bucket * 255 / steps)
+
+    def get(
+        self,
+        frame: Surface,
+        flip: bool = False,
+        alpha: int = 255,
+        tint: Optional[Tuple[int, int, int]] = None,
+    ) -> Surface:
+        alpha = self.quantize_alpha(alpha)
+        if not flip and alpha == 255 and tint is None:
+            return frame
+
+        key = (frame, flip, alpha, tint)
+        variant = self.__variants.get(key)
+        if variant is not None:
+            self.__variants.move_to_end(key)
+            return variant
+
+        variant = transform.flip(frame, True, False) if flip else frame.copy()
+        if tint is not None:
+            variant.fill(tint, special_flags=BLEND_RGB_MULT)
+        if alpha != 255:
+            variant.set_alpha(alpha)
+
+        self.__variants[key] = variant
+        while len(self.__variants) > self.max_size:
+            self.__variants.popitem(last=False)
+        return variant
+
+    def clear(self):
+        self.__variants.clear()
+
+
+surface_variants = SurfaceVariantCache()
@@ -1,10 +1,44 @@
-from typing import Union
+from typing import Optional, Union
 
 import pygame
 
 from logger import logger
 
 
+class SimClock:
+    """
+    milliseconds every Timer reads, wall clock by default, in virtual mode
+    only advance() moves it so the simulation can run faster than real time
+    """
+
+    __slots__ = ("virtual", "__ms")
+
+    def __init__(self) -> None:
+        self.virtual = False
+        self.__ms = 0.0
+
+    def set_virtual(self, virtual: bool, start_ms: Optional[float] = None):
+        """switching keeps the current time so running timers stay valid, unless start_ms is given"""
+        if virtual and not self.virtual:
+            self.__ms = float(pygame.time.get_ticks())
+        if start_ms is not None:
+            self.__ms = float(start_ms)
+        self.virtual = virtual
+
+    def advance(self, dt: float):
+        """dt in seconds, ignored on the wall clock"""
+        if self.virtual:
+            self.__ms += dt * 1000
+
+    def now(self) -> int:
+        if self.virtual:
+            return int(self.__ms)
+        return pygame.time.get_ticks()
+
+
+sim_clock = SimClock()
+
+
 class Timer:
     """
     Args:
@@ -14,13 +48,13 @@ class Timer:
     __slots__ = ("interval", "start_timer")
 
     def __init__(self, interval: Union[float, int], stale_init=False) -> None:
-        self.start_timer = pygame.time.get_ticks()
+        self.start_timer = sim_clock.now()
         if stale_init:
             self.start_timer -= interval - 1
         self.interval = int(interval)
 
     def reset_to_now(self):
-        self.start_timer = pygame.time.get_ticks()
+        self.start_timer = sim_clock.now()
 
     def has_reached_interval(self):
         return self.get_timediff() >= self.interval
@@ -29,14 +63,14 @@ class Timer:
         if 0 >= interval_ratio >= 1.0:
             logger.warning("interval_ratio must be within inclusive range of 0 and 1.0")
             return None
-        return (pygame.time.get_ticks() - self.start_timer) >= int(self.interval * interval_ratio)
+        return (sim_clock.now() - self.start_timer) >= int(self.interval * interval_ratio)
 
     def stale(self):
         if self.interval > 0:
             self.start_timer -= self.interval - 1
 
     def get_timediff(self):
-        return pygame.time.get_ticks() - self.start_timer
+        return sim_clock.now() - self.start_timer
 
     def get_timediff_ratio(self) -> float:
         td = self.get_timediff()
@@ -0,0 +1,21 @@
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+# the game resolves assets relative to the working directory, like `cd src && python game.py`
+SRC_PATH = Path(__file__).resolve().parent.parent / "src"
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+os.chdir(SRC_PATH)
+sys.path.insert(0, str(SRC_PATH))
+
+
+@pytest.fixture(scope="session")
+def game():
+    from game import Game
+
+    game = Game(headless=True)
+    yield game
+    game.close()
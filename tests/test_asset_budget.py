@@ -0,0 +1,44 @@
+import gc
+import time
+
+from managers.asset_manager import ANIMATION_SPECS, AssetStore
+
+
+def test_animations_outside_the_level_are_evicted_first(game):
+    sizes = AssetStore(ANIMATION_SPECS)
+    sizes.load_prefixes(("bat/",))
+    bat_bytes = sizes.loaded_bytes
+    sizes.load_prefixes(("fireworm/",))
+    fireworm_bytes = sizes.loaded_bytes - bat_bytes
+
+    # the older bat animations stay, the mushroom ones are not part of the level
+    store = AssetStore(ANIMATION_SPECS, budget_bytes=bat_bytes + fireworm_bytes)
+    store.level_prefixes = ("bat/",)
+    store.load_prefixes(("bat/",))
+    store.load_prefixes(("mushroom/",))
+    store.load_prefixes(("fireworm/",))
+    loaded = set(store)
+    assert {name for name in ANIMATION_SPECS if name.startswith(("bat/", "fireworm/"))} <= loaded
+    assert not any(name.startswith("mushroom/") for name in loaded)
+    assert store.loaded_bytes <= store.budget_bytes
+
+
+def test_evicted_animation_reloads_into_its_stand_in(game):
+    # a spec of its own so no other store shares its decoded frames
+    specs = {"bat/fly": {**ANIMATION_SPECS["bat/fly"], "options": {"trim_transparent_pixel": (True, None)}}}
+    store = AssetStore(specs, budget_bytes=1)
+    clip = store["bat/fly"]
+    sizes, duration = clip.sizes, clip.duration
+    del clip
+    store.evict("bat/fly")
+    gc.collect()
+
+    stand_in = store["bat/fly"]
+    assert (stand_in.sizes, stand_in.duration) == (sizes, duration)
+    deadline = time.perf_counter() + 5
+    while not store.is_loaded("bat/fly") and time.perf_counter() < deadline:
+        store.poll()
+        time.sleep(0.001)
+    assert store["bat/fly"] is stand_in
+    assert tuple(frame.get_size() for frame in stand_in.frames) == sizes
+    store.close()
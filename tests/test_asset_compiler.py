@@ -0,0 +1,31 @@
+from lib.asset_compiler import build
+from lib.frame_pack import FRAME_PACK_NAME, FramePack
+from managers.asset_manager import ANIMATION_SPECS
+
+
+def packed_hashes(build_dir):
+    pack = FramePack.open(build_dir / FRAME_PACK_NAME)
+    assert pack is not None
+    hashes = set(pack.index)
+    pack.close()
+    return hashes
+
+
+def test_missing_frames_are_baked_again(tmp_path):
+    specs = {"bat/fly": ANIMATION_SPECS["bat/fly"]}
+    frames = build(specs, tmp_path, jobs=1)["bat/fly"]["frames"]
+    (tmp_path / frames[0]).unlink()
+
+    assert build(specs, tmp_path, jobs=1)["bat/fly"]["frames"] == frames
+    assert (tmp_path / frames[0]).exists()
+
+
+def test_frame_pack_follows_the_manifest(tmp_path):
+    specs = {name: ANIMATION_SPECS[name] for name in ("bat/fly", "bat/hit")}
+    manifest = build(specs, tmp_path, jobs=1)
+    assert packed_hashes(tmp_path) == {entry["hash"] for entry in manifest.values()}
+
+    # nothing is baked when a spec is dropped, the pack still loses its frames
+    del specs["bat/hit"]
+    manifest = build(specs, tmp_path, jobs=1)
+    assert packed_hashes(tmp_path) == {manifest["bat/fly"]["hash"]}
@@ -0,0 +1,6 @@
+from managers.asset_manager import assets_manager
+
+
+def test_headless_frames_stay_unconverted(game):
+    assert not assets_manager.assets.convert_frames
+    assert assets_manager.assets["bat/fly"].frames[0].get_parent() is None
@@ -0,0 +1,109 @@
+import random
+
+import pygame
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from constants import SIM_LOD_MAX_DT, SIM_TICK_RATE  # noqa: E402
+from lib.entity_store import EntityStore  # noqa: E402
+
+TICKS = 120
+ENEMIES = 200
+
+
+def spawn_in_free_space(game, rng: random.Random, count: int):
+    tilemap = game.tilemap
+    width, height = tilemap.map_width * tilemap.tilewidth, tilemap.map_height * tilemap.tileheight
+    enemies = []
+    for _ in range(count):
+        enemy = game.spawn_entity(rng.choice(("mushroom", "fireworm", "bat")), (0, 0))
+        while True:
+            enemy.pos.update(rng.uniform(0, width), rng.uniform(0, height))
+            if enemy.hitbox().collidelist(tilemap.get_physics_rects(enemy.hitbox())) < 0:
+                break
+        enemy.velocity.update(rng.uniform(-3, 3), rng.uniform(-1200, 1200))
+        enemies.append(enemy)
+    return enemies
+
+
+def snapshot(enemies):
+    return [(tuple(enemy.pos), tuple(enemy.velocity), dict(enemy.contact_sides)) for enemy in enemies]
+
+
+@pytest.mark.parametrize("dt", [1 / SIM_TICK_RATE, SIM_LOD_MAX_DT], ids=["full_rate", "lod_max_dt"])
+@pytest.mark.parametrize("seed", [1, 2, 3])
+def test_batched_physics_matches_scalar(game, dt, seed):
+    """the numpy store moves and collides enemies exactly like PhysicsEntity over the real map"""
+    enemies = spawn_in_free_space(game, random.Random(seed), ENEMIES)
+    start = [(pygame.Vector2(enemy.pos), pygame.Vector2(enemy.velocity)) for enemy in enemies]
+    store = EntityStore()
+    for enemy in enemies:
+        enemy.sim_dt = dt
+        store.add(enemy)
+
+    try:
+        for _ in range(TICKS):
+            store.step(game.tilemap)
+        batched = snapshot(enemies)
+
+        for enemy, (pos, velocity) in zip(enemies, start):
+            enemy.pos.update(pos)
+            enemy.velocity.update(velocity)
+        for _ in range(TICKS):
+            for enemy in enemies:
+                enemy.handle_movement(dt)
+                enemy.identify_contact_sides()
+        scalar = snapshot(enemies)
+    finally:
+        for enemy in enemies:
+            enemy.remove()
+
+    mismatches = [
+        (type(enemy).__name__, enemy.uid, batch, single)
+        for enemy, batch, single in zip(enemies, batched, scalar)
+        if pygame.Vector2(batch[0]).distance_to(single[0]) > 1e-6 or batch[2] != single[2]
+    ]
+    assert mismatches == []
+
+
+def test_grid_only_spans_loaded_chunks(game):
+    """streamed maps rebuild the collision table over the loaded chunks, not the whole world"""
+    tilemap = game.tilemap
+    store = EntityStore()
+    keys = sorted(tilemap.chunks)
+    evicted = {key: tilemap.chunks.pop(key) for key in keys[len(keys) // 2 :]}
+    tilemap.chunks_version += 1
+    try:
+        store.step(tilemap)  # nothing due, the table is built lazily
+        enemy = game.spawn_entity("mushroom", (0, 0))
+        enemy.sim_dt = 1 / SIM_TICK_RATE
+        store.add(enemy)
+        store.step(tilemap)
+        loaded_rows = {key // tilemap.chunks_width for key in tilemap.chunks}
+        origin_row, _, rows, _ = store.grid_span
+        assert origin_row == min(loaded_rows) * tilemap.chunk_size
+        assert rows == (max(loaded_rows) - min(loaded_rows) + 1) * tilemap.chunk_size
+        assert rows < tilemap.chunks_height * tilemap.chunk_size
+        enemy.remove()
+    finally:
+        tilemap.chunks.update(evicted)
+        tilemap.chunks_version += 1
+
+
+def test_remove_keeps_hitbox_rows_with_their_entities(game):
+    store = EntityStore(capacity=2)
+    enemies = [game.spawn_entity(etype, (0, 0)) for etype in ("mushroom", "bat", "fireworm", "bat")]
+    try:
+        for enemy in enemies:
+            store.add(enemy)
+        store.remove(enemies[0])
+        store.remove(enemies[3])
+        assert len(store) == 2
+        for slot, enemy in enumerate(store.entities):
+            ox, oy = enemy.offset
+            assert tuple(store.hitbox_offset[slot]) == (ox, oy)
+            assert tuple(store.hitbox_size[slot]) == (enemy.size[0] - 2 * ox, enemy.size[1] - 2 * oy)
+    finally:
+        for enemy in enemies:
+            enemy.remove()
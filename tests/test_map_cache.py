@@ -0,0 +1,63 @@
+from types import SimpleNamespace
+
+from pygame import Rect
+
+import lib.tilemap
+from constants import MAP_PATH, TILEMAP_CHUNK_SIZE, TILEMAP_SCALE
+from lib.map_cache import MapCacheReader, map_fingerprint
+from lib.tilemap import Tilemap
+
+
+def load(cache_dir, monkeypatch) -> Tilemap:
+    monkeypatch.setattr(lib.tilemap, "MAP_CACHE_PATH", cache_dir)
+    tilemap = Tilemap(tile_scale=TILEMAP_SCALE, chunk_size=TILEMAP_CHUNK_SIZE, use_map_cache=True)
+    assert tilemap.load_map(1)
+    return tilemap
+
+
+def test_corrupt_chunk_rebuilds_from_tmx(game, tmp_path, monkeypatch):
+    fresh = load(tmp_path, monkeypatch)
+    cache_path = next(tmp_path.glob("1.*"))
+    corrupt_first_chunk(cache_path)
+    corrupted = cache_path.read_bytes()
+
+    rebuilt = load(tmp_path, monkeypatch)
+    assert rebuilt.chunks.keys() == fresh.chunks.keys()
+    for key, chunk in fresh.chunks.items():
+        assert rebuilt.chunks[key].collision_grid == chunk.collision_grid
+    assert cache_path.read_bytes() != corrupted
+
+
+def test_corrupt_chunk_streams_in_from_a_rebuilt_cache(game, tmp_path, monkeypatch):
+    fresh = load(tmp_path, monkeypatch)
+    key = corrupt_first_chunk(next(tmp_path.glob("1.*")))
+    monkeypatch.setattr(Tilemap, "game", SimpleNamespace(spawn_entity=lambda etype, pos: None))
+    tilemap = Tilemap(
+        tile_scale=TILEMAP_SCALE, chunk_size=TILEMAP_CHUNK_SIZE, use_map_cache=True, streaming=True, stream_radius=0
+    )
+    assert tilemap.load_map(1)
+
+    size = tilemap.chunk_size
+    cx, cy = key % tilemap.chunks_width, key // tilemap.chunks_width
+    area = Rect(cx * size * tilemap.tilewidth, cy * size * tilemap.tileheight, tilemap.tilewidth, tilemap.tileheight)
+    area.move_ip(tilemap.tilewidth, tilemap.tileheight)
+    assert not tilemap.is_area_loaded(area)
+
+    tilemap.update_streaming(area.topleft)
+    assert tilemap.chunks[key].collision_grid == fresh.chunks[key].collision_grid
+    assert tilemap.is_area_loaded(area)
+
+
+def corrupt_first_chunk(cache_path) -> int:
+    fingerprint = map_fingerprint(MAP_PATH / "1.tmx", TILEMAP_SCALE, TILEMAP_CHUNK_SIZE)
+    reader = MapCacheReader.open(cache_path, fingerprint)
+    assert reader is not None
+    chunk_index = reader.meta["chunk_index"]
+    reader.close()
+    data_start = cache_path.stat().st_size - sum(length for _, length in chunk_index.values())
+    key, (offset, length) = next(iter(chunk_index.items()))
+
+    data = bytearray(cache_path.read_bytes())
+    data[data_start + offset : data_start + offset + length] = bytes(length)
+    cache_path.write_bytes(bytes(data))
+    return key
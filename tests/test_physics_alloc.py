@@ -0,0 +1,66 @@
+import tracemalloc
+from itertools import repeat
+
+import pytest
+
+STEPS = 500
+# a walking enemy turns around every this many steps so it keeps pacing over the same tiles
+PACE_STEPS = 50
+# at most four short lived ints alive at once, pygame hands out rect coordinates
+# past 256 as new int objects, an iterator or range on top already goes past this
+TRANSIENT_BYTES = 128
+
+
+def traced_during(fn, calls: int, warmup: int = 2):
+    """bytes still allocated after calls to fn and the peak on top of where it started"""
+    for _ in range(warmup):
+        fn()
+    calls_left = repeat(None, calls)
+    tracemalloc.start()
+    try:
+        before, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        for _ in calls_left:
+            fn()
+        after, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return after - before, peak - before
+
+
+@pytest.fixture(params=[0.0, 1.0], ids=["standing", "walking"])
+def grounded_enemy(game, request):
+    enemy = game.spawn_entity("mushroom", (game.player.pos.x + 200, game.player.pos.y))
+    enemy.velocity.x = request.param
+    for _ in range(120):
+        enemy.handle_movement(1 / 60)
+        enemy.identify_contact_sides()
+    assert enemy.grounded()
+    yield enemy
+    enemy.remove()
+
+
+def test_physics_step_keeps_allocations_flat(grounded_enemy):
+    steps_left = PACE_STEPS
+
+    def step():
+        nonlocal steps_left
+        steps_left -= 1
+        if steps_left == 0:
+            steps_left = PACE_STEPS
+            grounded_enemy.velocity.x = -grounded_enemy.velocity.x
+        grounded_enemy.handle_movement(1 / 60)
+        grounded_enemy.identify_contact_sides()
+
+    def noop():
+        pass
+
+    baseline, baseline_peak = traced_during(noop, STEPS)
+    # a full pace back and forth first, so the reused collider list reached its final size
+    retained, peak = traced_during(step, STEPS, warmup=2 * PACE_STEPS)
+    _, short_peak = traced_during(step, 5)
+
+    # nothing survives a step and what a step allocates does not grow with the number of steps
+    assert retained == baseline
+    assert peak == short_peak
+    assert peak <= baseline_peak + TRANSIENT_BYTES
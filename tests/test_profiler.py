@@ -0,0 +1,29 @@
+import pydebug
+from lib.profiler import OVERLAY_REFRESH, FrameProfiler
+
+
+def test_overlay_renders_text_only_on_refresh(game, monkeypatch):
+    rendered = []
+    render = pydebug.pgdebug_render
+    monkeypatch.setattr(pydebug, "pgdebug_render", lambda text: rendered.append(text) or render(text))
+    profiler = FrameProfiler(capacity=64, enabled=True)
+    profiler.show_overlay = True
+
+    for _ in range(OVERLAY_REFRESH):
+        profiler.begin_frame()
+        profiler.lap("update")
+        profiler.lap("render")
+        profiler.draw_overlay()
+        pydebug.Debug.draw_all(game.screen)
+    profiler.end_frame()
+
+    # the refresh on the first frame had no stats to show yet
+    assert len(rendered) == 0
+    profiler.begin_frame()
+    profiler.draw_overlay()
+    pydebug.Debug.clear()
+    # one line per phase, rendered on the refresh and only blitted again afterwards
+    profiler.draw_overlay()
+    assert len(pydebug._DEBUG_REFS) == 2
+    assert len(rendered) == 2
+    pydebug.Debug.clear()
@@ -0,0 +1,49 @@
+import random
+
+import pytest
+
+from entities.enemy_entity import Enemy
+from utils.combat_utils import TargetQuery
+
+TICKS = 300
+ENEMIES = 40
+
+
+@pytest.fixture
+def crowd(game):
+    """enemies around the player, inside and just outside their chase ranges"""
+    rng = random.Random(7)
+    px, py = game.player.pos
+    enemies = [
+        game.spawn_entity(rng.choice(("mushroom", "fireworm", "bat")), (px + rng.uniform(-600, 600), py - 40))
+        for _ in range(ENEMIES)
+    ]
+    yield enemies
+    for enemy in enemies:
+        enemy.remove()
+
+
+def test_fsm_reads_targets_measured_after_movement(game, crowd, monkeypatch):
+    """what an FSM reads from query_target() matches a scalar measurement at that moment"""
+    stale = []
+    reads = 0
+    query_target = Enemy.query_target
+
+    def checked_query_target(enemy):
+        nonlocal reads
+        query = query_target(enemy)
+        fresh = TargetQuery()
+        fresh.refresh(enemy)
+        reads += 1
+        if (query.can_chase, query.can_attack) != (fresh.can_chase, fresh.can_attack) or (
+            abs(query.dx - fresh.dx) > 1e-6 or abs(query.dy - fresh.dy) > 1e-6
+        ):
+            stale.append((type(enemy).__name__, enemy.uid))
+        return query
+
+    monkeypatch.setattr(Enemy, "query_target", checked_query_target)
+    for _ in range(TICKS):
+        game.tick(game.sim_dt)
+
+    assert reads > 0
+    assert stale == []